@@ -16,10 +16,7 @@ for example "0 1" will process all grid ids. For more than one, call this script
 multiple times: "0 2" and "1 2"
 """
 import sys
-import functools
-import multiprocessing
 import os
-import sys
 from pathlib import Path
 
 import geopandas as gpd
@@ -28,7 +25,6 @@ import numpy as np
 import pandas as pd
 
 sys.path.append("../src/")  # required for jem module
-from jem.analyse import analyse
 from jem.model import jem
 
 
@@ -45,76 +41,66 @@ def get_empty_results(grid_id):
     )
 
 
-def init_pool(path_to_network, path_to_network_split):
-    global nodes
-    global edges
-    global nodes_split
-    global edges_split
-
-    nodes = gpd.read_file(path_to_network, layer="nodes", engine="pyogrio")
-    edges = gpd.read_file(path_to_network, layer="edges", engine="pyogrio")
-
+def read_failures(path_to_network_split):
+    """Return the ids of nodes and edges to fail, by grid id"""
     # use the split network (with linked grid ids) to select failures
-    nodes_split = gpd.read_file(path_to_network_split, layer="nodes", engine="pyogrio")
+    nodes_split = gpd.read_file(
+        path_to_network_split,
+        layer="nodes",
+        engine="pyogrio",
+        columns=["id", "asset_type", "grid_ids"],
+        ignore_geometry=True,
+    )
     # note: in the current model nodes of type 'sink' cannot be failed
-    nodes_split = nodes_split[nodes_split["asset_type"] != "sink"].copy()
-    edges_split = gpd.read_file(path_to_network_split, layer="edges", engine="pyogrio")
-
-
-def compute_failure(
-    grid_id, path_to_network, path_to_flows, output_dir, plot=False, debug=False
-):
-    nodes_to_attack = nodes_split[nodes_split.grid_ids == grid_id].id.to_list()
-    edges_to_attack = edges_split[edges_split.grid_ids == grid_id].id.unique().tolist()
-
-    # run model
-    run = jem(
-        str(path_to_network),
-        str(path_to_network),
-        str(path_to_flows),
-        print_to_console=False,
-        nodes_to_attack=nodes_to_attack,
-        edges_to_attack=edges_to_attack,
-        super_source=True,
-        super_sink=False,
+    nodes_split = nodes_split[nodes_split["asset_type"] != "sink"]
+    edges_split = gpd.read_file(
+        path_to_network_split,
+        layer="edges",
+        engine="pyogrio",
+        columns=["id", "grid_ids"],
+        ignore_geometry=True,
     )
-    run.build()
-    run.optimise(print_to_console=False)
+    failed_nodes = nodes_split.groupby("grid_ids").id.agg(list)
+    failed_edges = edges_split.groupby("grid_ids").id.unique().map(list)
+    return {
+        grid_id: (
+            failed_nodes.get(grid_id, []),
+            failed_edges.get(grid_id, []),
+        )
+        for grid_id in edges_split["grid_ids"].unique()
+    }
 
-    # get results
-    results = analyse(model_run=run)
-    nodes_with_shortfall = results.nodes_with_shortfall().node.to_list()
 
-    if results.nodes_with_shortfall().empty:
+def write_failure(record, failures, output_dir, network, plot=False, debug=False):
+    grid_id = record["key"]
+    nodes_to_attack, edges_to_attack = failures.get(grid_id, ([], []))
+    impacts = record["impacts"]
+
+    if impacts is None or impacts.empty:
         df = get_empty_results(grid_id)
     else:
-        population = results.get_population_at_nodes(
-            nodes_with_shortfall, col_id="affected_node_id"
-        )
-        demand = results.get_demand_at_nodes(
-            nodes_with_shortfall, col_id="affected_node_id"
-        )
-        df = population.merge(demand, on="affected_node_id")
-        df["grid_id"] = grid_id
-        df["population_affected"] = df["population"]
-        df["demand_affected"] = df["demand"]
-        df = df[
-            [
-                "grid_id",
-                "affected_node_id",
-                "population_affected",
-                "demand_affected",
-            ]
-        ]
-
-    if debug:
-        results.edge_flows.to_csv(
-            output_dir / f"result_arcflows_{grid_id}.csv", index=False
+        df = pd.DataFrame(
+            {
+                "grid_id": grid_id,
+                "affected_node_id": impacts["node"],
+                "population_affected": impacts["population"],
+                "demand_affected": impacts["demand"],
+            }
         )
 
-    if plot:
+    edge_flows = record.get("arcflows", None)
+    if debug and edge_flows is not None:
+        edge_flows.to_csv(output_dir / f"result_arcflows_{grid_id}.csv", index=False)
+
+    if plot and edge_flows is not None:
         plot_flows(
-            output_dir, results, nodes, edges, nodes_to_attack, edges_to_attack, grid_id
+            output_dir,
+            edge_flows,
+            network.geometry("nodes"),
+            network.geometry("edges"),
+            nodes_to_attack,
+            edges_to_attack,
+            grid_id,
         )
 
     df.to_csv(output_dir / f"disruption_{grid_id}.csv", index=False)
@@ -123,10 +109,10 @@ def compute_failure(
 
 
 def plot_flows(
-    output_dir, results, nodes, edges, nodes_to_attack, edges_to_attack, grid_id
+    output_dir, edge_flows, nodes, edges, nodes_to_attack, edges_to_attack, grid_id
 ):
     edges_idx = edges.set_index(["from_id", "to_id"])
-    flows_idx = results.edge_flows.set_index(["from_id", "to_id"])
+    flows_idx = edge_flows.set_index(["from_id", "to_id"])
     edges_with_flows = edges_idx.join(flows_idx)
     edges_with_flows["log_flow"] = log_nonzero(edges_with_flows.flow)
 
@@ -189,9 +175,9 @@ if __name__ == "__main__":
     if not os.path.exists(path_to_output):
         os.makedirs(path_to_output)
 
-    edges_split = gpd.read_file(path_to_network_split, layer="edges", engine="pyogrio")
+    failures = read_failures(path_to_network_split)
 
-    grid_ids = [-1] + sorted(list(edges_split["grid_ids"].unique()))
+    grid_ids = [-1] + sorted(failures)
 
     n = len(grid_ids)
     n_per_chunk = (n // nchunks) + 1
@@ -204,20 +190,25 @@ if __name__ == "__main__":
     print(f"Chunks {n=},{chunk=},{nchunks=},{n_per_chunk=}")
     print(f"Processing ids[{from_n}:{to_n}]")
 
-    compute_failure_partial = functools.partial(
-        compute_failure,
-        path_to_network=path_to_network,
-        path_to_flows=path_to_flows,
-        output_dir=path_to_output,
-        plot=True,
-        debug=False,
+    # preprocess the network once; each worker builds it once and fails
+    # the assets of one grid cell at a time in place
+    network = jem(
+        str(path_to_network),
+        str(path_to_network),
+        str(path_to_flows),
+        print_to_console=False,
+        super_source=True,
+        super_sink=False,
     )
-
-    with multiprocessing.Pool(
-        multiprocessing.cpu_count() // 2,
-        initializer=init_pool,
-        initargs=(path_to_network, path_to_network_split),
-    ) as pool:
-        pool.map(compute_failure_partial, grid_ids[from_n:to_n])
+    scenarios = {}
+    for grid_id in grid_ids[from_n:to_n]:
+        nodes_to_attack, edges_to_attack = failures.get(grid_id, ([], []))
+        scenarios[grid_id] = {"nodes": nodes_to_attack, "edges": edges_to_attack}
+
+    plot = True
+    debug = False
+    # one worker per core of the SLURM task, see utils.default_workers()
+    for record in network.sweep(scenarios, arcflows=plot or debug, cache=True):
+        write_failure(record, failures, path_to_output, network, plot, debug)
 
     print(f"Done ids[{from_n}:{to_n}]")
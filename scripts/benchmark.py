@@ -0,0 +1,265 @@
+#!/usr/bin/env python
+# coding: utf-8
+"""Benchmark JEM model builds on synthetic networks
+
+Generates a synthetic network shaped like the Jamaica network (a meshed
+transmission core with radial feeders of poles and sinks) and times the
+model build methods and solver backends against each other.
+
+Usage:
+
+    python benchmark.py build <n_feeders> <n_timesteps>
+    python benchmark.py solvers <n_feeders> <n_timesteps>
+    python benchmark.py radial <n_feeders> <n_timesteps>
+    python benchmark.py junctions <n_feeders> <n_timesteps>
+    python benchmark.py connectivity <n_feeders> <n_timesteps>
+    python benchmark.py decompose <n_feeders> <n_timesteps> <workers>
+    python benchmark.py scenarios <n_feeders> <n_timesteps> <batch_size>
+
+    python benchmark.py build 200 24
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append("../src/")  # required for jem module
+from jem.model import jem
+from jem.scenarios import ScenarioRunner
+
+
+def synthetic_network(
+    n_feeders=50,
+    feeder_depth=4,
+    n_sources=5,
+    n_core=20,
+    n_timesteps=24,
+    seed=0,
+    span_poles=0,
+):
+    """Return (nodes, edges, flows) of a synthetic bi-directional network
+
+    span_poles junctions are strung between consecutive poles of a feeder.
+    """
+    rng = np.random.default_rng(seed)
+    node_ids = []
+    asset_types = []
+    links = []
+
+    def add_node(asset_type):
+        node_ids.append(f"node_{len(node_ids) + 1}")
+        asset_types.append(asset_type)
+        return node_ids[-1]
+
+    # meshed core: a ring of substations with random chords
+    core = [add_node("junction") for _ in range(n_core)]
+    links += [(core[k], core[(k + 1) % n_core]) for k in range(n_core)]
+    chords = rng.integers(0, n_core, size=(n_core // 2, 2))
+    links += [(core[a], core[b]) for a, b in chords if a != b]
+
+    # supply
+    for k in range(n_sources):
+        links.append((add_node("source"), core[rng.integers(n_core)]))
+
+    # radial feeders: chains of poles with a sink at every pole
+    for _ in range(n_feeders):
+        parent = core[rng.integers(n_core)]
+        for _ in range(feeder_depth):
+            for _ in range(span_poles):
+                span = add_node("junction")
+                links.append((parent, span))
+                parent = span
+            pole = add_node("junction")
+            links.append((parent, pole))
+            links.append((pole, add_node("sink")))
+            parent = pole
+
+    nodes = pd.DataFrame({"id": node_ids, "asset_type": asset_types})
+    nodes["subtype"] = nodes.asset_type
+    nodes["population"] = np.where(
+        nodes.asset_type == "sink", rng.integers(10, 500, len(nodes)), 0
+    )
+
+    links = pd.DataFrame(links, columns=["from_id", "to_id"])
+    reverse = links.rename(columns={"from_id": "to_id", "to_id": "from_id"})
+    edges = pd.concat([links, reverse], ignore_index=True)
+    edges.insert(0, "id", [f"edge_{k + 1}" for k in range(len(edges))])
+    edges["length"] = rng.uniform(0.1, 5.0, len(edges)).round(3)
+    edges["min"] = 0
+    edges["max"] = 100
+
+    sinks = nodes.loc[nodes.asset_type == "sink", "id"]
+    sources = nodes.loc[nodes.asset_type == "source", "id"]
+    profile = 1 + 0.5 * np.sin(np.linspace(0, 2 * np.pi, n_timesteps))
+    demand = rng.uniform(0.1, 2.0, len(sinks))
+    flows = pd.DataFrame(np.outer(profile, demand).round(3), columns=sinks.to_list())
+    supply = 1.2 * flows.sum(axis=1).max() / len(sources)
+    for s in sources:
+        flows[s] = supply
+    return nodes, edges, flows
+
+
+def time_build(nodes, edges, flows, method, repeats=3):
+    """Return the best wall time (s) of jem(...).build(method=method)"""
+    timings = []
+    for _ in range(repeats):
+        run = jem(nodes, edges, flows, super_sink=False)
+        start = time.perf_counter()
+        run.build(method=method)
+        run.model.update()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def benchmark_build(n_feeders, n_timesteps):
+    nodes, edges, flows = synthetic_network(
+        n_feeders=n_feeders, n_timesteps=n_timesteps
+    )
+    print(f"{len(nodes)} nodes, {len(edges)} edges, {n_timesteps} timesteps")
+    for method in ["constraints", "matrix"]:
+        print(f"{method:>12}: {time_build(nodes, edges, flows, method):.3f} s")
+
+
+def time_solve(nodes, edges, flows, solver, repeats=3, **kwargs):
+    """Return the best wall times (s) of build and optimise with a solver"""
+    timings = []
+    for _ in range(repeats):
+        run = jem(nodes, edges, flows, super_sink=False, solver=solver)
+        start = time.perf_counter()
+        run.build(flow_bounds="variables", **kwargs)
+        built = time.perf_counter()
+        run.optimise()
+        timings.append((built - start, time.perf_counter() - built))
+    return min(timings, key=sum)
+
+
+def benchmark_solvers(n_feeders, n_timesteps):
+    nodes, edges, flows = synthetic_network(
+        n_feeders=n_feeders, n_timesteps=n_timesteps
+    )
+    print(f"{len(nodes)} nodes, {len(edges)} edges, {n_timesteps} timesteps")
+    for solver in ["gurobi", "highs"]:
+        build, solve = time_solve(nodes, edges, flows, solver)
+        print(f"{solver:>12}: build {build:.3f} s, solve {solve:.3f} s")
+
+
+def benchmark_radial(n_feeders, n_timesteps, solver="highs"):
+    nodes, edges, flows = synthetic_network(
+        n_feeders=n_feeders, n_timesteps=n_timesteps
+    )
+    print(f"{len(nodes)} nodes, {len(edges)} edges, {n_timesteps} timesteps")
+    for radial in [False, True]:
+        build, solve = time_solve(nodes, edges, flows, solver, radial=radial)
+        print(f"radial={radial!s:>5}: build {build:.3f} s, solve {solve:.3f} s")
+
+
+def benchmark_junctions(n_feeders, n_timesteps, solver="highs"):
+    nodes, edges, flows = synthetic_network(
+        n_feeders=n_feeders, n_timesteps=n_timesteps, span_poles=4
+    )
+    print(f"{len(nodes)} nodes, {len(edges)} edges, {n_timesteps} timesteps")
+    for junctions in [False, True]:
+        build, solve = time_solve(nodes, edges, flows, solver, junctions=junctions)
+        print(f"junctions={junctions!s:>5}: build {build:.3f} s, solve {solve:.3f} s")
+
+
+def benchmark_connectivity(n_feeders, n_timesteps, solver="highs"):
+    nodes, edges, flows = synthetic_network(
+        n_feeders=n_feeders, n_timesteps=n_timesteps
+    )
+    print(f"{len(nodes)} nodes, {len(edges)} edges, {n_timesteps} timesteps")
+    failures = nodes.loc[nodes.asset_type == "junction", "id"]
+    scenarios = [{"nodes": [node]} for node in failures]
+    for connectivity in [False, True]:
+        network = jem(nodes, edges, flows, super_sink=False, solver=solver)
+        runner = ScenarioRunner(
+            network, screen=False, connectivity=connectivity, flow_bounds="variables"
+        )
+        start = time.perf_counter()
+        for _ in runner.run(scenarios):
+            pass
+        print(
+            f"connectivity={connectivity!s:>5}: {len(scenarios)} scenarios "
+            f"in {time.perf_counter() - start:.3f} s, {runner.solved} LP solves"
+        )
+
+
+def benchmark_decompose(n_feeders, n_timesteps, workers, solver="highs"):
+    nodes, edges, flows = synthetic_network(
+        n_feeders=n_feeders, n_timesteps=n_timesteps
+    )
+    print(f"{len(nodes)} nodes, {len(edges)} edges, {n_timesteps} timesteps")
+    for decompose in [False, True]:
+        run = jem(nodes, edges, flows, super_sink=False, solver=solver)
+        start = time.perf_counter()
+        run.build(flow_bounds="variables", decompose=decompose)
+        run.optimise(workers=workers)
+        print(f"decompose={decompose!s:>5}: {time.perf_counter() - start:.3f} s")
+
+
+def benchmark_scenarios(n_feeders, n_timesteps, batch_size, solver="gurobi"):
+    nodes, edges, flows = synthetic_network(
+        n_feeders=n_feeders, n_timesteps=n_timesteps
+    )
+    print(f"{len(nodes)} nodes, {len(edges)} edges, {n_timesteps} timesteps")
+    failures = nodes.loc[nodes.asset_type == "junction", "id"]
+    scenarios = [{"nodes": [node]} for node in failures]
+
+    # one model built and solved per scenario
+    start = time.perf_counter()
+    for scenario in scenarios:
+        run = jem(
+            nodes,
+            edges,
+            flows,
+            super_sink=False,
+            solver=solver,
+            nodes_to_attack=scenario["nodes"],
+        )
+        run.build(flow_bounds="variables")
+        run.optimise()
+    elapsed = time.perf_counter() - start
+    print(
+        f"{'one model per scenario':>24}: {len(scenarios) / elapsed:.1f} "
+        f"scenarios/s"
+    )
+
+    # one model, bounds changed in place
+    network = jem(nodes, edges, flows, super_sink=False, solver=solver)
+    network.build(flow_bounds="variables")
+    runner = ScenarioRunner(network, screen=False)
+    start = time.perf_counter()
+    for _ in runner.run(scenarios):
+        pass
+    elapsed = time.perf_counter() - start
+    print(f"{'in place':>24}: {len(scenarios) / elapsed:.1f} scenarios/s")
+
+    # batches of scenarios in one multi-scenario model
+    start = time.perf_counter()
+    network.solve_scenarios(scenarios, batch_size=batch_size)
+    elapsed = time.perf_counter() - start
+    print(
+        f"{f'batch_size={batch_size}':>24}: {len(scenarios) / elapsed:.1f} "
+        f"scenarios/s"
+    )
+
+
+if __name__ == "__main__":
+    benchmark = sys.argv[1]
+    if benchmark == "build":
+        benchmark_build(int(sys.argv[2]), int(sys.argv[3]))
+    elif benchmark == "solvers":
+        benchmark_solvers(int(sys.argv[2]), int(sys.argv[3]))
+    elif benchmark == "radial":
+        benchmark_radial(int(sys.argv[2]), int(sys.argv[3]))
+    elif benchmark == "junctions":
+        benchmark_junctions(int(sys.argv[2]), int(sys.argv[3]))
+    elif benchmark == "connectivity":
+        benchmark_connectivity(int(sys.argv[2]), int(sys.argv[3]))
+    elif benchmark == "decompose":
+        benchmark_decompose(int(sys.argv[2]), int(sys.argv[3]), int(sys.argv[4]))
+    elif benchmark == "scenarios":
+        benchmark_scenarios(int(sys.argv[2]), int(sys.argv[3]), int(sys.argv[4]))
+    else:
+        print(f"Unrecognised benchmark: {benchmark}")
@@ -4,13 +4,14 @@
 #SBATCH --time=12:00:00
 #SBATCH --nodes=1
 #SBATCH --ntasks-per-node=1
+#SBATCH --cpus-per-task=16
 #SBATCH --partition=interactive
-#SBATCH --mail-type=BEGIN,END  --mail-user=aman.majid@ouce.ox.ac.uk
-#SBATCH --array=1-20
 
 module load Gurobi/9.1.2-GCCcore-10.3.0
 module load Anaconda3//2020.11
 
 source activate jem_model
 
-python run_node_impact_assessment.py $SLURM_ARRAY_TASK_ID
+# one job sweeps every failure, with one worker per core
+python single_point_failure_analysis.py ../ nodes $SLURM_CPUS_PER_TASK
+python single_point_failure_analysis.py ../ edges $SLURM_CPUS_PER_TASK
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# coding: utf-8
+"""Fail nodes or edges one at a time
+
+This script damages every node (or edge) of the network one at a time (single
+point failure analysis) to evaluate the sinks damaged and population affected.
+Failures are swept by a pool of workers, each holding one built model.
+
+Usage:
+    python single_point_failure_analysis.py <base_path> <nodes|edges> [workers]
+
+Results are appended, keyed by the id of the failed asset, to
+<base_path>/outputs/<node|edge>_impact_assessment/results.sqlite as they
+finish. Running the script again resumes from the assets not yet stored.
+See single_point_failure_postprocess.py to read them.
+"""
+
+import os
+import sys
+from pathlib import Path
+
+sys.path.append("../src/")  # required for jem module
+from jem import readers
+from jem.model import jem
+from jem.store import ResultStore
+
+if __name__ == "__main__":
+    base_path = Path(sys.argv[1])
+    kind = sys.argv[2].rstrip("s")
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else None
+
+    if kind not in ["node", "edge"]:
+        print(f"Unrecognised asset kind: {sys.argv[2]}")
+        sys.exit(1)
+
+    path_to_flows = base_path / "data/generated_nodal_flows.csv"
+    path_to_nodes = base_path / "data/nodes.shp"
+    path_to_edges = base_path / "data/edges.shp"
+    path_to_output = base_path / f"outputs/{kind}_impact_assessment"
+
+    # check if output folder exists, create if not
+    if not os.path.exists(path_to_output):
+        os.makedirs(path_to_output)
+
+    # assets to attack, in file order
+    path_to_assets = path_to_nodes if kind == "node" else path_to_edges
+    assets = readers.read_table(str(path_to_assets), kind + "s", ["id", "asset_type"])
+
+    with ResultStore(str(path_to_output / "results.sqlite")) as store:
+        print(f"{len(store)} of {len(assets)} {kind}s already stored")
+
+        # sinks cannot be failed in the current model
+        sinks = assets.id[assets.asset_type == "sink"]
+        store.append({"key": key, "status": "skipped"} for key in sinks)
+        completed = store.completed()
+        scenarios = {
+            key: {kind + "s": [key]} for key in assets.id if key not in completed
+        }
+        if not scenarios:
+            print("done")
+            sys.exit()
+
+        network = jem(
+            str(path_to_nodes),
+            str(path_to_edges),
+            str(path_to_flows),
+            print_to_console=False,
+            super_source=True,
+            super_sink=False,
+        )
+        for count, record in enumerate(
+            network.sweep(scenarios, workers=workers, store=store, cache=True), 1
+        ):
+            print("completed iteration " + str(count) + " of " + str(len(scenarios)))
+
+    print("done")
@@ -3,7 +3,8 @@
 single_point_failure_postprocess.py
 
     This script is used to conduct postprocessing on the results from single-point
-    failure analyses of nodes and edges (../linux/outputs/<node/edge>_impact_assessment)
+    failure analyses of nodes and edges (../outputs/<node/edge>_impact_assessment),
+    see single_point_failure_analysis.py
 
 '''
 
@@ -12,83 +13,63 @@ print('Run: single_point_failure_postprocess.py')
 print('')
 
 import os
+import sys
 import pandas as pd
 
+sys.path.append('../src/')  # required for jem module
+from jem import readers
+from jem.store import ResultStore
+
 # ---------------
 # GLOBAL VARS
 
 output_path     = '../data/single_point_failure/'
-node_path       = '../linux/outputs/node_impact_assessment/' 
-edge_path       = '../linux/outputs/edge_impact_assessment/'
+node_path       = '../outputs/node_impact_assessment/'
+edge_path       = '../outputs/edge_impact_assessment/'
+path_to_nodes   = '../data/nodes.shp'
+path_to_edges   = '../data/edges.shp'
+
+
+def read_results(path, path_to_assets, kind):
+    '''return the stored results of one analysis, one row per attacked asset
+    and affected node
+    '''
+    # one scan of the store; each scenario is stored once
+    with ResultStore(path + 'results.sqlite') as store:
+        results = store.read()
+
+    assets = readers.read_table(path_to_assets, kind + 's', ['id', 'asset_type'])
+    attacked_type = pd.Series(assets.asset_type.to_numpy(), index=assets.id)
+
+    results['total_nodes_affected'] = results.groupby('key').node.transform('count')
+    results.loc[results.node.isna(), 'total_nodes_affected'] = None
+    return pd.DataFrame({
+        'attacked_' + kind + '_id'      : results.key,
+        'affected_node_id'              : results.node,
+        'attacked_' + kind + '_type'    : results.key.map(attacked_type),
+        'affected_node_type'            : results.asset_type,
+        'total_nodes_affected'          : results.total_nodes_affected,
+        'population_affected'           : results.population,
+        'demand_affected'               : results.demand,
+        'status'                        : results.status,
+    })
+
+
+if not os.path.isdir(output_path):
+    os.makedirs(output_path)
 
 # ---------------
 # NODES
 
-# read results and merge into one df
-merged_results = []
-for i in os.listdir(node_path):
-    if '.csv' in i:
-        d = pd.read_csv(node_path + i)
-        prev_cols = list(d.columns)
-        d['batch_number'] = int(i.split('_')[4])
-        d = d[ ['batch_number'] + prev_cols ]
-        merged_results.append(d)
-
-print('merged node results')
-
-# concat
-merged_results = pd.concat(merged_results,ignore_index=True)
-merged_results = merged_results.sort_values(['batch_number','iteration_number']).reset_index(drop=True)
-# remove duplicates
-merged_processed = merged_results.copy()
-prev_cols =  merged_processed.columns
-
-merged_processed = merged_processed.groupby(['attacked_node_id',
-                                             'affected_node_id'],as_index=False,dropna=False).first()
-
-#merged_processed = merged_processed.drop(['batch_number','iteration_number'],axis=1)
-merged_processed = merged_processed.sort_values(['batch_number','iteration_number'])
-merged_processed = merged_processed[prev_cols].reset_index(drop=True)
-
-print('removed duplicates')
-
-# save
+merged_processed = read_results(node_path, path_to_nodes, 'node')
 merged_processed.to_csv(output_path + 'single_point_failure_results_nodes.csv',index=False)
 print('saved merged node results')
 
 # ---------------
 # EDGES
 
-# read results and merge into one df
-merged_results = []
-for i in os.listdir(edge_path):
-    if '.csv' in i:
-        d = pd.read_csv(edge_path + i)
-        prev_cols = list(d.columns)
-        d['batch_number'] = int(i.split('.')[0].split('_')[4])
-        d = d[ ['batch_number'] + prev_cols ]
-        merged_results.append(d)
-        
-print('merged edge results')
-
-# concat
-merged_results = pd.concat(merged_results,ignore_index=True)
-merged_results = merged_results.sort_values(['batch_number','iteration_number']).reset_index(drop=True)
-# remove duplicates
-merged_processed = merged_results.copy()
-prev_cols =  merged_processed.columns
-
-merged_processed = merged_processed.groupby(['attacked_edge_id',
-                                             'affected_node_id'],as_index=False,dropna=False).first()
-
-#merged_processed = merged_processed.drop(['batch_number','iteration_number'],axis=1)
-merged_processed = merged_processed.sort_values(['batch_number','iteration_number'])
-merged_processed = merged_processed[prev_cols].reset_index(drop=True)
-
-print('removed duplicates')
-
-# save
+merged_processed = read_results(edge_path, path_to_edges, 'edge')
 merged_processed.to_csv(output_path + 'single_point_failure_results_edges.csv',index=False)
 
 print('saved merged edge results')
-print('done')
\ No newline at end of file
+print('done')
@@ -1,13 +1,12 @@
 import pandas as pd
 import geopandas as gpd
 import re
-from shapely.ops import nearest_points
 
 # Add local directory to path
 import sys
 sys.path.append("../../")
 # Import infrasim spatial tools
-from JEM.jem.spatial import get_isolated_graphs
+from JEM.jem.spatial import get_isolated_graphs, snap_to_nodes
 # Import local copy of snkit
 from JEM.snkit.snkit.src.snkit.network import *
 
@@ -94,10 +93,13 @@ def add_edge_notation(network):
     i_field = 'from_id'
     j_field = 'to_id'
     id_attribute = 'id'
-    #find nearest node to the START coordinates of the line -- and return the 'ID' attribute
-    network.edges[i_field] = network.edges.geometry.apply(lambda geom: nearest(Point(geom.coords[0]), network.nodes)[id_attribute])
-    #find nearest node to the END coordinates of the line -- and return the 'ID' attribute
-    network.edges[j_field] = network.edges.geometry.apply(lambda geom: nearest(Point(geom.coords[-1]), network.nodes)[id_attribute])
+    #find nearest nodes to the START and END coordinates of all lines at once
+    snapped = snap_to_nodes(network.nodes, network.edges, id_attribute=id_attribute)
+    network.edges[i_field] = snapped[i_field]
+    network.edges[j_field] = snapped[j_field]
+    #keep snapping distances to flag bad snaps
+    network.edges['from_snap'] = snapped['from_snap']
+    network.edges['to_snap'] = snapped['to_snap']
     return network
 
 
@@ -0,0 +1,121 @@
+"""
+    arcs.py
+        Lazy (arc, timestep) index of the INFRASIM model
+
+        Edge attributes are kept once per edge and broadcast over the
+        timesteps only when a column is read. Rows are ordered in timestep
+        blocks, i.e. row = t * |E| + edge, as the time expanded edge table
+        used to be.
+"""
+
+import numpy as np
+import pandas as pd
+
+from . import ids
+from .meta import metainfo
+
+
+class ArcIndex:
+    """Edges of a jem network indexed by timestep
+
+    Columns read like a DataFrame, e.g. edge_indices.from_id or
+    edge_indices[["from_id", "to_id", "timestep"]], and are broadcast from
+    arrays of length |E| on every read. Use set() to change values, also
+    for single timesteps, and frame() to materialise the table.
+    """
+
+    def __init__(self, edges, flows):
+        self.static = edges[metainfo["edges_header"]].reset_index(drop=True)
+        self.timesteps = np.asarray(flows.timestep.unique())
+        self.n_edges = len(self.static)
+
+        # per timestep attributes of the flow data, e.g. dates
+        header = metainfo["flow_header"]
+        self.time_attributes = (
+            flows[header + ["timestep"]]
+            .groupby(by="timestep")
+            .max()
+            .reindex(self.timesteps)
+        )
+
+        # columns that vary over time, as (|T|, |E|) arrays
+        self.varying = {}
+
+    @property
+    def columns(self):
+        return (
+            self.static.columns.to_list()
+            + ["timestep"]
+            + self.time_attributes.columns.to_list()
+        )
+
+    def __len__(self):
+        return self.n_edges * len(self.timesteps)
+
+    def __getattr__(self, name):
+        if "static" in self.__dict__ and name in self.columns:
+            return self[name]
+        raise AttributeError(name)
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return pd.Series(self.column(key), name=key)
+        return pd.DataFrame({column: self.column(column) for column in key})
+
+    def column(self, name, edges=None, timesteps=None):
+        """Return a column as an array, broadcast over the timesteps
+
+        edges optionally selects edge positions in every timestep block, and
+        timesteps the timestep blocks.
+        """
+        if edges is None:
+            edges = slice(None)
+        n = len(np.arange(self.n_edges)[edges])
+        rows = slice(None)
+        if timesteps is not None:
+            rows = pd.Index(self.timesteps).get_indexer(timesteps)
+        steps = self.timesteps[rows]
+        if name == "timestep":
+            return np.repeat(steps, n)
+        if name in self.time_attributes:
+            return np.repeat(self.time_attributes[name].to_numpy()[rows], n)
+        if name in self.varying:
+            return self.varying[name][rows][:, edges].ravel()
+        values = self.static[name]
+        if ids.interned(values):
+            codes = np.tile(values.cat.codes.to_numpy()[edges], len(steps))
+            return pd.Categorical.from_codes(codes, dtype=values.dtype)
+        return np.tile(values.to_numpy()[edges], len(steps))
+
+    def set(self, column, value, where=None, timesteps=None):
+        """Set column to value for edges where (a mask of length |E|)
+
+        Without timesteps the value holds in every timestep. Setting only some
+        timesteps keeps the column as a (|T|, |E|) array from then on.
+        """
+        if where is None:
+            where = np.ones(self.n_edges, dtype=bool)
+        where = np.asarray(where, dtype=bool)
+        if timesteps is None and column not in self.varying:
+            self.static.loc[where, column] = value
+            return
+        if column not in self.varying:
+            values = self.static[column].to_numpy(dtype="float64")
+            self.varying[column] = np.tile(values, (len(self.timesteps), 1))
+        rows = slice(None)
+        if timesteps is not None:
+            rows = np.isin(self.timesteps, timesteps)
+        block = self.varying[column][rows]
+        block[:, where] = value
+        self.varying[column][rows] = block
+
+    def unique(self, indices):
+        """Return edge positions of the last row of every unique arc"""
+        static = [column for column in indices if column != "timestep"]
+        return np.flatnonzero(~self.static.duplicated(subset=static, keep="last"))
+
+    def frame(self, edges=None, timesteps=None):
+        """Return the time expanded table, optionally for some edges or timesteps"""
+        return pd.DataFrame(
+            {column: self.column(column, edges, timesteps) for column in self.columns}
+        )
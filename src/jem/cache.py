@@ -0,0 +1,250 @@
+"""
+    cache.py
+        Binary cache of preprocessed jem networks and solved scenarios
+
+        A network is cached after its files are read, the super arcs are added,
+        the flows are tidied and the ids are interned. Nodes, edges and flows
+        are stored as Parquet files (GeoParquet for GeoDataFrames), with id
+        columns kept as dictionary encoded codes, under a key that hashes the
+        contents of the input files and the options that change preprocessing.
+
+        Outcomes of failure scenarios (status, objective and shortfall per
+        sink) are stored in a SQLite file, under a key that hashes the network
+        fingerprint and the sorted failed ids, so the same failure set is only
+        solved once whichever sweep it comes from. The least recently used
+        outcomes are evicted beyond a size cap.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+
+# bump to invalidate caches written by older versions
+version = 1
+
+# files read alongside a shapefile
+shapefile_parts = [".shp", ".shx", ".dbf", ".prj", ".cpg"]
+
+tables = ["nodes", "edges", "flows"]
+
+# default size cap of the scenario cache, in bytes
+scenario_cache_size = 1 << 30
+
+# seconds to wait for other processes writing to the scenario cache
+busy_timeout = 60
+
+
+def cacheable(*inputs):
+    """Return True if every input is a path, i.e. its contents can be hashed
+
+    Networks passed in as DataFrames are not cached.
+    """
+    return all(isinstance(item, (str, os.PathLike)) for item in inputs)
+
+
+def input_files(path):
+    """Return the files read for an input path"""
+    path = os.fspath(path)
+    stem, extension = os.path.splitext(path)
+    if extension == ".shp":
+        parts = [stem + part for part in shapefile_parts]
+        return [part for part in parts if os.path.exists(part)]
+    return [path]
+
+
+def key(inputs, **options):
+    """Return a hex digest of the input file contents and options"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(json.dumps({"version": version, **options}, default=str).encode())
+    for path in inputs:
+        for name in input_files(path):
+            digest.update(os.path.splitext(name)[1].encode())
+            with open(name, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(chunk)
+    return digest.hexdigest()
+
+
+def path(cache_dir, digest):
+    """Return the directory of a cache entry"""
+    return os.path.join(cache_dir, "networks", digest)
+
+
+def load(cache_dir, digest):
+    """Return cached (nodes, edges, flows), or None if not cached"""
+    directory = path(cache_dir, digest)
+    if not os.path.isdir(directory):
+        return None
+    network = []
+    for name in tables:
+        geo = os.path.join(directory, name + ".geoparquet")
+        if os.path.exists(geo):
+            network.append(gpd.read_parquet(geo))
+        else:
+            network.append(pd.read_parquet(os.path.join(directory, name + ".parquet")))
+    return tuple(network)
+
+
+def store(cache_dir, digest, nodes, edges, flows):
+    """Write (nodes, edges, flows) to the cache under digest"""
+    directory = path(cache_dir, digest)
+    if os.path.isdir(directory):
+        return
+    os.makedirs(os.path.dirname(directory), exist_ok=True)
+
+    # write to a scratch directory first so readers never see a partial entry
+    scratch = tempfile.mkdtemp(dir=os.path.dirname(directory))
+    try:
+        for name, table in zip(tables, [nodes, edges, flows]):
+            if isinstance(table, gpd.GeoDataFrame):
+                table.to_parquet(os.path.join(scratch, name + ".geoparquet"))
+            else:
+                table.to_parquet(os.path.join(scratch, name + ".parquet"))
+        os.rename(scratch, directory)
+    except OSError:
+        # another process stored the same network first
+        shutil.rmtree(scratch, ignore_errors=True)
+        if not os.path.isdir(directory):
+            raise
+
+
+# ---
+# solved scenarios
+
+
+def fingerprint(network, **options):
+    """Return a hex digest of the preprocessed tables of network and options
+
+    The arc index is hashed too, so bounds set with edge_indices.set() give
+    another digest. options are those that change the LP, e.g. the build
+    options.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    attacks = {
+        "nodes_to_attack": sorted(map(str, network.nodes_to_attack or [])),
+        "edges_to_attack": sorted(map(str, network.edges_to_attack or [])),
+    }
+    digest.update(
+        json.dumps({"version": version, **attacks, **options}, default=str).encode()
+    )
+    arcs = network.edge_indices
+    for table in [network.nodes, network.edges, network.flows, arcs.static]:
+        table = table.drop(columns="geometry", errors="ignore")
+        digest.update(json.dumps(list(map(str, table.columns))).encode())
+        digest.update(pd.util.hash_pandas_object(table, index=False).to_numpy())
+    for column in sorted(arcs.varying):
+        digest.update(column.encode())
+        digest.update(np.ascontiguousarray(arcs.varying[column]).tobytes())
+    return digest.hexdigest()
+
+
+class ScenarioCache:
+    """Outcomes of failure scenarios solved on one network
+
+    Outcomes are dicts of "status", "objective" and "shortfall", a list of
+    [node, timestep, shortfall] of the nodes short of supply. Lookups mark
+    outcomes as used, and put() evicts the least recently used outcomes once
+    the stored outcomes pass max_bytes. Every write is committed at once, so
+    sweeps in other processes can share the file. Use as a context manager,
+    or call close(), to close the file.
+    """
+
+    def __init__(self, cache_dir, fingerprint, max_bytes=None):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.fingerprint = fingerprint
+        self.max_bytes = max_bytes or scenario_cache_size
+        self.connection = sqlite3.connect(
+            os.path.join(cache_dir, "scenarios.sqlite"), timeout=busy_timeout
+        )
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        with self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS outcomes "
+                "(digest TEXT PRIMARY KEY, outcome TEXT, size INTEGER, used INTEGER)"
+            )
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS outcomes_used ON outcomes (used)"
+            )
+        self.hits = 0
+        self.misses = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM outcomes").fetchone()[0]
+
+    @property
+    def size(self):
+        """Bytes of the stored outcomes, written by any process"""
+        return self.connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM outcomes"
+        ).fetchone()[0]
+
+    def key(self, nodes=None, edges=None):
+        """Return the digest of a failure set on this network"""
+        failures = {
+            "nodes": sorted(set(map(str, nodes or []))),
+            "edges": sorted(set(map(str, edges or []))),
+        }
+        digest = hashlib.blake2b(self.fingerprint.encode(), digest_size=16)
+        digest.update(json.dumps(failures).encode())
+        return digest.hexdigest()
+
+    def get(self, digest):
+        """Return the outcome stored under digest, or None"""
+        row = self.connection.execute(
+            "SELECT outcome FROM outcomes WHERE digest = ?", (digest,)
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        with self.connection:
+            self.connection.execute(
+                "UPDATE outcomes SET used = ? WHERE digest = ?",
+                (time.time_ns(), digest),
+            )
+        return json.loads(row[0])
+
+    def put(self, outcomes):
+        """Store (digest, outcome) pairs, then evict beyond the size cap"""
+        with self.connection:
+            for digest, outcome in outcomes:
+                outcome = json.dumps(outcome)
+                self.connection.execute(
+                    "INSERT OR IGNORE INTO outcomes VALUES (?, ?, ?, ?)",
+                    (digest, outcome, len(outcome), time.time_ns()),
+                )
+            self.evict()
+
+    def evict(self):
+        """Remove the least recently used outcomes, down to the size cap"""
+        excess = self.size - self.max_bytes
+        if excess <= 0:
+            return
+        evicted = []
+        rows = self.connection.execute(
+            "SELECT digest, size FROM outcomes ORDER BY used"
+        )
+        for digest, size in rows:
+            if excess <= 0:
+                break
+            evicted.append((digest,))
+            excess -= size
+        self.connection.executemany("DELETE FROM outcomes WHERE digest = ?", evicted)
+
+    def close(self):
+        self.connection.commit()
+        self.connection.close()
@@ -0,0 +1,173 @@
+"""
+    decomposition.py
+        Time decomposition of the INFRASIM model
+
+        No constraint links one timestep to another (there is no storage or
+        ramping), so the model splits into one independent LP per timestep.
+"""
+
+import hashlib
+from concurrent.futures import FIRST_COMPLETED, wait
+
+import numpy as np
+import pandas as pd
+
+from . import matrix
+from . import reduction
+from . import solvers
+from . import utils
+from .meta import metainfo
+
+# state of each worker process, set by init_worker()
+worker = {}
+
+# blocks in flight per worker
+queue_depth = 2
+
+# arc columns that go into the LP of a block
+lp_columns = [
+    metainfo["i_field"],
+    metainfo["j_field"],
+    metainfo["cost_column"],
+    metainfo["lower_bound"],
+    metainfo["upper_bound"],
+]
+
+
+def init_worker(nodes, edges, solver, flow_bounds, options, reduced):
+    """Keep the static network, options and shared reductions in a worker"""
+    worker["nodes"] = nodes
+    worker["edges"] = edges
+    worker["solver"] = solver
+    worker["flow_bounds"] = flow_bounds
+    worker["options"] = options
+    worker["reduced"] = reduced
+
+
+def solve_block(timestep, arcs, flows):
+    """Return the arc flows of one timestep, or None if it is not optimal
+
+    arcs is None when the reductions were computed once, see init_worker().
+    """
+    block = matrix.Network(worker["nodes"], worker["edges"], flows, [timestep])
+    solver = solvers.get_solver(worker["solver"], model_name=f"infrasim_{timestep}")
+
+    if arcs is None:
+        reductions, lp_arcs, node_table = worker["reduced"]
+        lp_arcs = lp_arcs.assign(timestep=timestep)
+    else:
+        reductions, lp_arcs, node_table = reduction.reduce(
+            worker["nodes"], arcs, [timestep], **worker["options"]
+        )
+    matrix.add_to_solver(
+        solver,
+        block,
+        lp_arcs,
+        flow_bounds=worker["flow_bounds"],
+        node_table=node_table,
+    )
+    solver.solve()
+    if not solver.optimal:
+        return None
+    return reduction.expand(reductions, solver.values())
+
+
+def block_keys(network, edges):
+    """Return a key per timestep, the same for timesteps with the same LP
+
+    Timesteps are keyed on their nodal flows and the arc columns that vary
+    over time.
+    """
+    timesteps = network.timesteps
+    nodal = network.flows.pivot(index="timestep", columns="node", values="flow")
+    keys = pd.util.hash_pandas_object(nodal.reindex(timesteps), index=False)
+    keys = keys.to_numpy().astype(str)
+    varying = network.edge_indices.varying
+    for column in lp_columns:
+        if column in varying:
+            values = varying[column][:, edges]
+            keys = keys + [hashlib.blake2b(row.tobytes()).hexdigest() for row in values]
+    return pd.factorize(keys)[0]
+
+
+def solve(network, workers=None):
+    """Return flows on the arcs of network from one LP per timestep
+
+    workers defaults to utils.default_workers() and workers=1 solves in this
+    process. Returns None if any block has no optimal solution.
+    """
+    if workers is None:
+        workers = utils.default_workers()
+    arcs = network.edge_indices
+    edges = arcs.unique(network.indices)
+    timesteps = network.timesteps
+    flows = network.flows.groupby("timestep", sort=False)
+    options = {
+        "slack": network.slack,
+        "junctions": network.junctions,
+        "radial": network.radial,
+    }
+
+    # timesteps of each block, one block per distinct LP with unique_timesteps
+    codes = np.arange(len(timesteps))
+    if network.unique_timesteps:
+        codes = block_keys(network, edges)
+    first = np.unique(codes, return_index=True)[1]
+
+    # the same arcs in every timestep are reduced once, for every block
+    reduced = None
+    if not any(column in arcs.varying for column in lp_columns):
+        t = timesteps[first[0]]
+        reduced = reduction.reduce(
+            network.nodes, arcs.frame(edges, timesteps=[t]), [t], **options
+        )
+
+    def blocks():
+        for k in first:
+            t = timesteps[k]
+            block_arcs = None
+            if reduced is None:
+                block_arcs = arcs.frame(edges, timesteps=[t])
+            yield k, (t, block_arcs, flows.get_group(t))
+
+    n = len(edges)
+    flow = np.zeros(n * len(timesteps))
+    optimal = True
+
+    def finished(k, result):
+        if result is None:
+            return False
+        for position in np.flatnonzero(codes == codes[k]):
+            flow[position * n : (position + 1) * n] = result
+        return True
+
+    initargs = (
+        network.nodes,
+        network.edges,
+        network.solver.name,
+        network.flow_bounds,
+        options,
+        reduced,
+    )
+    if workers == 1:
+        init_worker(*initargs)
+        for k, block in blocks():
+            optimal &= finished(k, solve_block(*block))
+        return flow if optimal else None
+
+    # blocks are read from the arc index as workers free up
+    pending = blocks()
+    with utils.process_pool(workers, init_worker, initargs) as pool:
+        running = {}
+        for k, block in pending:
+            running[pool.submit(solve_block, *block)] = k
+            if len(running) == workers * queue_depth:
+                break
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                optimal &= finished(running.pop(future), future.result())
+                block = next(pending, None)
+                if block is not None:
+                    running[pool.submit(solve_block, *block[1])] = block[0]
+    return flow if optimal else None
@@ -0,0 +1,290 @@
+"""
+    graph.py
+        Compact graph views of a jem network
+
+        Arcs are held in a CSR adjacency (indptr over node codes plus the arc
+        order) so that searches over the network run as vectorised numpy
+        passes, one pass per breadth first level, without networkx or the LP.
+"""
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.sparse import csgraph
+
+from . import ids
+from . import matrix
+from .meta import metainfo
+from .params import constants
+
+super_nodes = ["super_source", "super_sink"]
+
+
+def csr(n, u):
+    """Return (indptr, order) of a CSR adjacency of arcs leaving nodes u"""
+    order = np.argsort(u, kind="stable")
+    indptr = np.concatenate([[0], np.cumsum(np.bincount(u, minlength=n))])
+    return indptr, order
+
+
+def neighbours(indptr, rows):
+    """Return (row, position) of every CSR entry in rows"""
+    counts = indptr[rows + 1] - indptr[rows]
+    owner = np.repeat(rows, counts)
+    offset = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return owner, np.repeat(indptr[rows], counts) + offset
+
+
+def asset_types(node_index, nodes):
+    """Return the asset type of every node in node_index, None if not in nodes"""
+    asset_type = np.full(len(node_index), None, dtype=object)
+    asset_type[ids.positions(node_index, nodes.id)] = nodes.asset_type
+    return asset_type
+
+
+def super_arcs(node_index, u, v):
+    """Return a mask of the arcs u -> v into or out of a super node"""
+    codes = node_index.get_indexer(super_nodes)
+    return np.isin(u, codes) | np.isin(v, codes)
+
+
+def attach(n, nodes, labels):
+    """Return the single label attached to each of n nodes
+
+    Nodes without a label get -1 and nodes attached to more than one label
+    get -2.
+    """
+    lowest = np.full(n, np.iinfo("int64").max)
+    highest = np.full(n, -1)
+    np.minimum.at(lowest, nodes, labels)
+    np.maximum.at(highest, nodes, labels)
+    return np.where(highest < 0, -1, np.where(lowest == highest, highest, -2))
+
+
+class NodeArcs:
+    """Rows of an arc table into and out of every node, by timestep
+
+    Arcs are held in two CSR indexes over (node, timestep) keys, one by
+    from_id and one by to_id, so the arcs of a node are a slice of each
+    and nodal sums over all nodes and timesteps are one bincount.
+    """
+
+    def __init__(self, table, node_index, timesteps=None):
+        i_field, j_field = metainfo["i_field"], metainfo["j_field"]
+        self.table = table
+        self.node_index = node_index
+        self.n = len(node_index)
+        self.timesteps = [None] if timesteps is None else list(timesteps)
+        self.n_timesteps = len(self.timesteps)
+        t = np.zeros(len(table), dtype="int64")
+        if timesteps is not None:
+            t = pd.Index(self.timesteps).get_indexer(table.timestep)
+        u = ids.positions(node_index, table[i_field])
+        v = ids.positions(node_index, table[j_field])
+        self.out_key = u * self.n_timesteps + t
+        self.in_key = v * self.n_timesteps + t
+        n_keys = self.n * self.n_timesteps
+        self.out_indptr, self.out_order = csr(n_keys, self.out_key)
+        self.in_indptr, self.in_order = csr(n_keys, self.in_key)
+
+    def rows(self, node, inflow=True, outflow=True):
+        """Return the table rows of arcs into and/or out of node, in order"""
+        k = self.node_index.get_indexer([node])[0]
+        if k < 0:
+            return np.array([], dtype="int64")
+        lo, hi = k * self.n_timesteps, (k + 1) * self.n_timesteps
+        rows = []
+        if inflow:
+            rows.append(self.in_order[self.in_indptr[lo] : self.in_indptr[hi]])
+        if outflow:
+            rows.append(self.out_order[self.out_indptr[lo] : self.out_indptr[hi]])
+        return np.unique(np.concatenate(rows))
+
+    def sums(self, values):
+        """Return (inflow, outflow) sums of values as (nodes, timesteps) arrays"""
+        n_keys = self.n * self.n_timesteps
+        shape = (self.n, self.n_timesteps)
+        inflow = np.bincount(self.in_key, weights=values, minlength=n_keys)
+        outflow = np.bincount(self.out_key, weights=values, minlength=n_keys)
+        return inflow.reshape(shape), outflow.reshape(shape)
+
+
+class Connectivity:
+    """Source reachability of a jem network under failures
+
+    shortfall() removes the failed nodes and edges, searches from every
+    source and returns the sinks that are cut off from supply. The answer
+    is exact, without the LP, unless the part of the network still reached
+    could be capacity-limited, in which case None is returned.
+    """
+
+    def __init__(self, network):
+        i_field, j_field = metainfo["i_field"], metainfo["j_field"]
+        edges = network.edges.reset_index(drop=True)
+        slacks = edges[edges[i_field] == "super_source"]
+        slacks = slacks.drop_duplicates(subset=j_field, keep="last")
+        edges = edges[~edges[i_field].isin(super_nodes)]
+        edges = edges[~edges[j_field].isin(super_nodes)]
+        edges = edges.drop_duplicates(subset=[i_field, j_field], keep="last")
+
+        # ---
+        # node codes and types
+        nodes = network.nodes
+        self.node_index = matrix.node_index(nodes, edges)
+        self.n = len(self.node_index)
+        position = ids.positions(self.node_index, nodes.id)
+        asset_type = asset_types(self.node_index, nodes)
+        self.is_source = asset_type == "source"
+        self.is_sink = asset_type == "sink"
+        self.population = np.zeros(self.n)
+        if "population" in nodes:
+            self.population[position] = nodes.population.fillna(0)
+
+        # ---
+        # nodes the super source supplies without limit in every timestep
+        arcs = network.edge_indices
+        shape = (len(arcs.timesteps), len(slacks))
+        upper = arcs.column(metainfo["upper_bound"], slacks.index).reshape(shape)
+        upper = upper.astype("float64") * constants["upper_bound_scale"]
+        uncapped = (upper >= constants["super_source_maximum"]).all(axis=0)
+        self.supplied = np.zeros(self.n, dtype=bool)
+        self.supplied[ids.positions(self.node_index, slacks[j_field][uncapped])] = True
+
+        # ---
+        # nodal supply and demand, one column per timestep
+        self.timesteps = network.timesteps
+        flows = network.flows
+        self.flows = np.zeros((self.n, len(self.timesteps)))
+        self.flows[
+            ids.positions(self.node_index, flows.node),
+            pd.Index(self.timesteps).get_indexer(flows.timestep),
+        ] = flows.flow.to_numpy()
+
+        # ---
+        # arcs
+        self.u = ids.positions(self.node_index, edges[i_field])
+        self.v = ids.positions(self.node_index, edges[j_field])
+        self.edge_ids = edges["id"].reset_index(drop=True)
+
+        # bounds of every timestep, as the LP reads them from edge_indices
+        shape = (len(arcs.timesteps), len(edges))
+        lower = arcs.column(metainfo["lower_bound"], edges.index).reshape(shape)
+        upper = arcs.column(metainfo["upper_bound"], edges.index).reshape(shape)
+        upper = upper.astype("float64") * constants["upper_bound_scale"]
+        self.limited = (lower > 0).any(axis=0)
+        self.limited |= (upper < constants["super_source_maximum"]).any(axis=0)
+
+        # sinks do not pass flow on and sources take no inflow; arcs closed
+        # in only some timesteps stay open, and limited
+        self.open = (upper > 0).any(axis=0)
+        self.open &= ~self.is_sink[self.u] & ~self.is_source[self.v]
+        self.alive = np.ones(self.n, dtype=bool)
+        if network.nodes_to_attack:
+            self.alive &= ~self.node_index.isin(network.nodes_to_attack)
+        if network.edges_to_attack:
+            self.open &= ~self.edge_ids.isin(network.edges_to_attack).to_numpy()
+        self.indptr, self.order = csr(self.n, self.u)
+
+    def failures(self, nodes=None, edges=None):
+        """Return (alive nodes, open arcs) masks when nodes and edges fail"""
+        alive = self.alive.copy()
+        if nodes:
+            alive &= ~self.node_index.isin(nodes)
+        open_arcs = self.open & alive[self.u] & alive[self.v]
+        if edges:
+            open_arcs &= ~self.edge_ids.isin(edges).to_numpy()
+        return alive, open_arcs
+
+    def reachable(self, alive, open_arcs):
+        """Return a mask of nodes reached from the sources"""
+        reached = np.zeros(self.n, dtype=bool)
+        frontier = np.flatnonzero(self.is_source & alive)
+        reached[frontier] = True
+        while len(frontier) > 0:
+            _, position = neighbours(self.indptr, frontier)
+            arcs = self.order[position]
+            arcs = arcs[open_arcs[arcs]]
+            frontier = np.unique(self.v[arcs])
+            frontier = frontier[~reached[frontier]]
+            reached[frontier] = True
+        return reached
+
+    def capacity_limited(self, reached, open_arcs):
+        """Return True if sinks reached could still be short of supply
+
+        The reached part is not capacity-limited if it has no capacitated
+        arcs and splits into relay components (nodes that are neither sources
+        nor sinks joined by arcs running both ways) where every source and
+        every reached sink attaches to a single component, and the sources of
+        each component cover its demand in every timestep.
+        """
+        n, u, v = self.n, self.u, self.v
+        used = open_arcs & reached[u]
+        if self.limited[used].any():
+            return True
+
+        relay = reached & ~self.is_source & ~self.is_sink
+        inner = used & relay[u] & relay[v]
+        pairs = u[inner] * n + v[inner]
+        if not np.isin(v[inner] * n + u[inner], pairs).all():
+            return True
+        graph = sparse.coo_matrix(
+            (np.ones(inner.sum()), (u[inner], v[inner])), shape=(n, n)
+        )
+        n_labels, labels = csgraph.connected_components(graph, directed=False)
+
+        feeds = used & self.is_source[u] & relay[v]
+        source_label = attach(n, u[feeds], labels[v[feeds]])
+        fed = used & relay[u] & self.is_sink[v]
+        sink_label = attach(n, v[fed], labels[u[fed]])
+        sources = np.flatnonzero(self.is_source & (source_label >= 0))
+        sinks = np.flatnonzero(self.is_sink & reached)
+        if (source_label[self.is_source & reached] == -2).any():
+            return True
+        if (sink_label[sinks] < 0).any():
+            return True
+
+        supply = np.zeros((n_labels, len(self.timesteps)))
+        demand = np.zeros((n_labels, len(self.timesteps)))
+        np.add.at(supply, source_label[sources], self.flows[sources])
+        np.add.at(demand, sink_label[sinks], self.flows[sinks])
+        return (demand > supply).any()
+
+    def disconnected_sinks(self, nodes=None, edges=None):
+        """Return sinks cut off from every source, with population and demand"""
+        alive, open_arcs = self.failures(nodes, edges)
+        reached = self.reachable(alive, open_arcs)
+        sinks = np.flatnonzero(self.is_sink & alive & ~reached)
+        return pd.DataFrame(
+            {
+                "node": np.tile(self.node_index[sinks], len(self.timesteps)),
+                "population": np.tile(self.population[sinks], len(self.timesteps)),
+                "demand": self.flows[sinks].T.ravel(),
+                "timestep": np.repeat(self.timesteps, len(sinks)),
+            }
+        )
+
+    def shortfall(self, nodes=None, edges=None):
+        """Return nodes with shortfall, as statistics.nodes_with_shortfall()
+
+        Returns None when the LP is needed: the reached part could be
+        capacity-limited, a failed sink leaves the model infeasible, or a
+        disconnected sink has no uncapped super source arc to supply it.
+        """
+        alive, open_arcs = self.failures(nodes, edges)
+        if (self.is_sink & ~alive).any():
+            return None
+        reached = self.reachable(alive, open_arcs)
+        if self.capacity_limited(reached, open_arcs):
+            return None
+        sinks = np.flatnonzero(self.is_sink & ~reached)
+        if not self.supplied[sinks].all():
+            return None
+        shortfall = self.flows[sinks].T.ravel()
+        return pd.DataFrame(
+            {
+                "node": np.tile(self.node_index[sinks], len(self.timesteps)),
+                "shortfall": shortfall,
+                "timestep": np.repeat(self.timesteps, len(sinks)),
+            }
+        )[shortfall > 0].reset_index(drop=True)
@@ -0,0 +1,78 @@
+"""
+    ids.py
+        Integer codes for node and edge ids
+
+        Ids are interned once when a jem model is created: node ids (with the
+        super nodes) and edge ids are stored as pandas Categoricals, whose
+        int32 codes index a lookup table of the id strings. Lookups run on
+        the codes, so each id string is hashed once, and strings only come
+        back when a column is read out.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def interned(values):
+    """Return True if values are a Categorical of interned ids"""
+    return isinstance(getattr(values, "dtype", None), pd.CategoricalDtype)
+
+
+def positions(index, values):
+    """Return the positions of values in index, -1 where missing
+
+    Only the categories of Categorical values are looked up in index.
+    """
+    if interned(values):
+        values = pd.Series(values)
+        lookup = index.get_indexer(values.cat.categories)
+        codes = values.cat.codes.to_numpy()
+        return np.where(codes < 0, -1, lookup[codes])
+    return index.get_indexer(values)
+
+
+def labels(index, codes, dtype=None):
+    """Return the ids at positions codes of index, as a Categorical of dtype
+
+    Falls back to the id strings when dtype is not a Categorical over index.
+    """
+    if isinstance(dtype, pd.CategoricalDtype) and dtype.categories.equals(index):
+        return pd.Categorical.from_codes(codes, dtype=dtype)
+    return index[codes]
+
+
+def keys(table, columns):
+    """Return rows of table columns as tuples, with the codes of interned ids"""
+    values = []
+    for name in columns:
+        column = table[name]
+        if interned(column):
+            column = column.cat.codes
+        values.append(column.tolist())
+    return list(zip(*values))
+
+
+class IdTable:
+    """Lookup table between ids and dense int32 codes"""
+
+    def __init__(self, ids):
+        self.ids = pd.Index(pd.unique(pd.Series(ids).dropna()))
+        self.dtype = pd.CategoricalDtype(self.ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def intern(self, values):
+        """Return values as a Categorical over the table"""
+        values = pd.Series(values)
+        if values.dtype == self.dtype:
+            return values
+        return values.astype(self.dtype)
+
+    def encode(self, values):
+        """Return the int32 codes of ids, -1 for unknown ids"""
+        return positions(self.ids, values).astype(np.int32)
+
+    def decode(self, codes):
+        """Return the ids of int32 codes as a Categorical"""
+        return pd.Categorical.from_codes(codes, dtype=self.dtype)
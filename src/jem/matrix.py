@@ -0,0 +1,188 @@
+"""
+    matrix.py
+        Sparse matrix form of the INFRASIM network flow model
+
+        The model is assembled from node-arc incidence matrices instead of
+        one tupledict sum per node and timestep. Rows of the incidence
+        matrices are ordered in timestep blocks, i.e. row = t * |N| + node.
+"""
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from .meta import metainfo
+from .params import constants
+from . import ids
+from . import utils
+
+
+class Network:
+    """Nodes, edges, flows and timesteps of a model, as read by constraint_blocks()
+
+    Used to build a model over a subset of the timesteps of a jem network.
+    """
+
+    def __init__(self, nodes, edges, flows, timesteps):
+        self.nodes = nodes
+        self.edges = edges
+        self.flows = flows
+        self.timesteps = timesteps
+
+
+def arc_table(edge_indices, indices):
+    """Return one row per unique (i, j, t) arc of an arcs.ArcIndex
+
+    Duplicated arcs keep their last row, matching the dict lookups used to
+    build the tupledict formulation.
+    """
+    return edge_indices.frame(edges=edge_indices.unique(indices))
+
+
+def node_index(nodes, arcs):
+    """Return an index of every node id referenced by the model
+
+    With interned ids this is the lookup table of the id codes.
+    """
+    if ids.interned(nodes.id):
+        return nodes.id.cat.categories
+    node_ids = pd.concat(
+        [nodes.id, arcs[metainfo["i_field"]], arcs[metainfo["j_field"]]],
+        ignore_index=True,
+    )
+    return pd.Index(node_ids.unique())
+
+
+def incidence(arcs, nodes, timesteps):
+    """Return (inflow, outflow) node-arc incidence matrices
+
+    Both matrices have shape (|T| * |N|, |A|) with rows in timestep blocks.
+    """
+    n = len(nodes)
+    t = pd.Index(timesteps).get_indexer(arcs.timestep)
+    i = ids.positions(nodes, arcs[metainfo["i_field"]])
+    j = ids.positions(nodes, arcs[metainfo["j_field"]])
+    k = np.arange(len(arcs))
+    shape = (len(timesteps) * n, len(arcs))
+    ones = np.ones(len(arcs))
+    inflow = sparse.csr_matrix((ones, (t * n + j, k)), shape=shape)
+    outflow = sparse.csr_matrix((ones, (t * n + i, k)), shape=shape)
+    return inflow, outflow
+
+
+def node_rows(nodes, list_of_nodes, timesteps):
+    """Return incidence rows of nodes, ordered by timestep then node"""
+    codes = nodes.get_indexer(list_of_nodes)
+    t = np.arange(len(timesteps))
+    return (t[:, None] * len(nodes) + codes[None, :]).ravel()
+
+
+def flow_vector(flows, list_of_nodes, timesteps):
+    """Return nodal flows ordered by timestep then node"""
+    index = pd.MultiIndex.from_product([timesteps, list_of_nodes])
+    flows = flows.set_index(["timestep", "node"]).flow
+    return flows.reindex(index).to_numpy(dtype="float64")
+
+
+def constraint_blocks(network, arcs, flow_bounds="constraints", node_table=None):
+    """Return the model constraints as (name, A, sense, rhs) blocks
+
+    Blocks are returned in the same order as in jem.build(method="constraints").
+    With flow_bounds="variables" the upper_bound and lower_bound rows are left
+    out, see variable_bounds(). Nodal rows are added for the nodes in
+    node_table, which defaults to network.nodes.
+    """
+    if node_table is None:
+        node_table = network.nodes
+    nodes = node_index(network.nodes, arcs)
+    timesteps = network.timesteps
+    inflow, outflow = incidence(arcs, nodes, timesteps)
+    blocks = []
+
+    # super source
+    if "super_source" in network.edges.from_id.unique():
+        rows = node_rows(nodes, ["super_source"], timesteps)
+        rhs = np.full(len(rows), constants["super_source_maximum"], dtype="float64")
+        blocks.append(("super_source_supply", outflow[rows], "<", rhs))
+
+    # super sink
+    if "super_sink" in network.edges.to_id.unique():
+        rows = node_rows(nodes, ["super_sink"], timesteps)
+        blocks.append(("super_sink_demand", inflow[rows], ">", np.zeros(len(rows))))
+
+    # supply
+    sources = utils.get_node_names(
+        nodes=node_table, index_column="asset_type", lookup="source"
+    )
+    rows = node_rows(nodes, sources, timesteps)
+    rhs = flow_vector(network.flows, sources, timesteps)
+    blocks.append(("supply", outflow[rows], "<", rhs))
+    blocks.append(("supply", inflow[rows], "=", np.zeros(len(rows))))
+
+    # demand
+    sinks = utils.get_node_names(
+        nodes=node_table, index_column="asset_type", lookup="sink"
+    )
+    rows = node_rows(nodes, sinks, timesteps)
+    rhs = flow_vector(network.flows, sinks, timesteps)
+    blocks.append(("demand", inflow[rows], "=", rhs))
+
+    # conservation of energy
+    blocks.append(("cons_of_energy", inflow[rows] - outflow[rows], "=", rhs))
+
+    # junction balance
+    junction_nodes = utils.get_node_names(
+        nodes=node_table, index_column="asset_type", lookup="junction"
+    )
+    rows = node_rows(nodes, junction_nodes, timesteps)
+    blocks.append(("junc_bal", inflow[rows] - outflow[rows], "=", np.zeros(len(rows))))
+
+    # flow bounds
+    if flow_bounds == "constraints":
+        identity = sparse.identity(len(arcs), format="csr")
+        upper_bound = (
+            arcs[metainfo["upper_bound"]].to_numpy(dtype="float64")
+            * constants["upper_bound_scale"]
+        )
+        lower_bound = arcs[metainfo["lower_bound"]].to_numpy(dtype="float64")
+        blocks.append(("upper_bound", identity, "<", upper_bound))
+        blocks.append(("lower_bound", identity, ">", lower_bound))
+
+    return blocks
+
+
+def variable_bounds(arcs):
+    """Return (lb, ub) arrays to set flow bounds directly on the arc variables
+
+    Upper bounds are scaled as in the upper_bound constraints. Scaled bounds at
+    or above the super source maximum act as a big-M and are left unbounded,
+    which keeps huge coefficients out of the model.
+    """
+    lb = arcs[metainfo["lower_bound"]].to_numpy(dtype="float64")
+    ub = (
+        arcs[metainfo["upper_bound"]].to_numpy(dtype="float64")
+        * constants["upper_bound_scale"]
+    )
+    ub[ub >= constants["super_source_maximum"]] = np.inf
+    return np.maximum(lb, 0), ub
+
+
+def add_to_solver(solver, network, arcs, flow_bounds="constraints", node_table=None):
+    """Add flow variables and constraints for arcs to a solver backend
+
+    Returns (variables, ub), the arc flow variables and their upper bounds.
+    """
+    cost = arcs[metainfo["cost_column"]].to_numpy(dtype="float64")
+    if flow_bounds == "variables":
+        lb, ub = variable_bounds(arcs)
+    else:
+        lb = np.zeros(len(arcs))
+        ub = np.full(len(arcs), np.inf)
+    variables = solver.add_variables(cost, lb, ub, name="arcflow")
+
+    blocks = constraint_blocks(
+        network, arcs, flow_bounds=flow_bounds, node_table=node_table
+    )
+    for name, A, sense, rhs in blocks:
+        solver.add_constraints(A, sense, rhs, name=name)
+    return variables, ub
@@ -13,6 +13,15 @@ metainfo = {
     "lower_bound": "min",
     "nodes_header": ["id", "asset_type", "subtype", "title", "capacity"],
     "edges_header": ["id", "from_id", "to_id", "length", "min", "max"],
+    "nodes_model_columns": [
+        "id",
+        "asset_type",
+        "subtype",
+        "title",
+        "capacity",
+        "population",
+    ],
+    "edges_model_columns": ["id", "from_id", "to_id", "length", "min", "max"],
     "flow_header": [],
     "edge_index_variables": ["from_id", "to_id", "timestep"],
     "infrasim_cache": "../data/__infrasim__/",
@@ -7,13 +7,22 @@
 
 import time
 
+import numpy as np
 import pandas as pd
-import gurobipy as gp
 import geopandas as gpd
 
 from . import utils
+from . import cache
+from . import decomposition
+from . import graph
+from . import ids
+from . import matrix
+from . import readers
+from . import reduction
+from . import solvers
 from . import spatial
 
+from .arcs import ArcIndex
 from .meta import metainfo
 from .params import constants
 from .statistics import statistics
@@ -22,8 +31,153 @@ class jem:
 
     def __init__(self, nodes, edges, flows, write=False, **kwargs):
 
-        # Read data
-        if not isinstance(nodes, pd.DataFrame):
+        # ---
+        # Read and preprocess data, or load it from the network cache
+        cache_dir = kwargs.get("cache", False)
+        if cache_dir is True:
+            cache_dir = metainfo["infrasim_cache"]
+        digest = None
+        network = None
+        if kwargs.get("preprocessed", False):
+            # tables of a jem network, e.g. from shared.attach()
+            network = nodes, edges, flows
+        elif cache_dir and cache.cacheable(nodes, edges, flows):
+            digest = cache.key(
+                [nodes, edges, flows],
+                timesteps=kwargs.get("timesteps", None),
+                super_source=kwargs.get("super_source", True),
+                super_sink=kwargs.get("super_sink", True),
+                all_columns=kwargs.get("all_columns", False),
+            )
+            network = cache.load(cache_dir, digest)
+        if network is None:
+            network = self._preprocess(nodes, edges, flows, **kwargs)
+
+        # GIS files whose geometry is read on demand, see geometry()
+        self.sources = {
+            kind: source
+            for kind, source in [("nodes", nodes), ("edges", edges)]
+            if isinstance(source, str) and readers.is_gis_file(source)
+        }
+        self._geometry = {}
+        nodes, edges, flows = network
+
+        # ---
+        # Intern node and edge ids as int32 codes
+        if ids.interned(nodes.id) and ids.interned(edges.id):
+            # interned already, by the network cache or shared.attach()
+            self.node_ids = ids.IdTable(nodes.id.cat.categories)
+            self.edge_ids = ids.IdTable(edges.id.cat.categories)
+        else:
+            self.node_ids = ids.IdTable(
+                pd.concat([nodes.id, edges.from_id, edges.to_id])
+            )
+            self.edge_ids = ids.IdTable(edges.id)
+        nodes["id"] = self.node_ids.intern(nodes.id)
+        edges["from_id"] = self.node_ids.intern(edges.from_id)
+        edges["to_id"] = self.node_ids.intern(edges.to_id)
+        edges["id"] = self.edge_ids.intern(edges.id)
+        flows["node"] = self.node_ids.intern(flows.node)
+        if digest is not None:
+            cache.store(cache_dir, digest, nodes, edges, flows)
+
+        # ---
+        # Create infrasim cache files
+        if write:
+            utils.create_dir(path=metainfo["infrasim_cache"])
+            spatial.graph_to_csv(nodes, edges, output_dir=metainfo["infrasim_cache"])
+            flows.to_csv(metainfo["infrasim_cache"] + "flows.csv")
+
+        # ---
+        # index edges by timestep
+        self.edge_indices = ArcIndex(edges, flows)
+
+        # ---
+        # Define sets
+        self.flows = flows
+        self.edges = edges
+        self.nodes = nodes
+        self.indices = metainfo["edge_index_variables"]
+        self.constants = constants
+        self.node_types = self.nodes.asset_type.unique().tolist()
+        self.technologies = self.nodes.subtype.unique().tolist()
+        self.timesteps = self.flows.timestep.unique().tolist()
+
+        # ---
+        # print out
+        self._print = kwargs.get("print_to_console", False)
+
+        # ---
+        # define solver model
+        self.model_name = "infrasim"
+        self.solver = solvers.get_solver(
+            kwargs.get("solver", "gurobi"),
+            model_name=self.model_name,
+            print_to_console=self._print,
+        )
+        self.model = self.solver.model
+
+        # ---
+        # define model temporal resolution
+        self.temporal_resolution = metainfo["temporal_resolution"]
+
+        # ---
+        # attackable nodes
+        self.nodes_to_attack = kwargs.get("nodes_to_attack", None)
+        self.edges_to_attack = kwargs.get("edges_to_attack", None)
+
+        # zero edges associated with attackable nodes
+        static = self.edge_indices.static
+        if not self.nodes_to_attack:
+            pass
+        else:
+            self.edge_indices.set(
+                "max", 0, where=static.from_id.isin(self.nodes_to_attack)
+            )
+            self.edge_indices.set(
+                "max", 0, where=static.to_id.isin(self.nodes_to_attack)
+            )
+
+        # zero attackable edges
+        if not self.edges_to_attack:
+            pass
+        else:
+            self.edge_indices.set("max", 0, where=static.id.isin(self.edges_to_attack))
+
+    def geometry(self, kind="edges"):
+        """Return nodes or edges as a GeoDataFrame
+
+        Geometry left out when reading GIS files is read from the source file
+        on first use. Rows added to the file data, i.e. super arcs, get no
+        geometry.
+        """
+        table = getattr(self, kind)
+        if isinstance(table, gpd.GeoDataFrame):
+            return table
+        if kind not in self.sources:
+            raise ValueError(f"No geometry to read for {kind}")
+        if kind not in self._geometry:
+            self._geometry[kind] = readers.read_geometry(self.sources[kind], kind)
+        geometry = self._geometry[kind].reset_index(drop=True)
+        geometry = geometry.reindex(range(len(table))).set_axis(table.index)
+        return gpd.GeoDataFrame(table, geometry=geometry)
+
+    def _preprocess(self, nodes, edges, flows, **kwargs):
+        """Read network data, add super arcs and tidy flows"""
+
+        # Read data, only the model columns of GIS files unless all_columns
+        tables = {}
+        if not kwargs.get("all_columns", False):
+            tables = readers.read_tables(
+                {
+                    kind: source
+                    for kind, source in [("nodes", nodes), ("edges", edges)]
+                    if isinstance(source, str) and readers.is_gis_file(source)
+                }
+            )
+        if "nodes" in tables:
+            nodes = tables["nodes"]
+        elif not isinstance(nodes, pd.DataFrame):
             if ".shp" in nodes:
                 nodes = gpd.read_file(nodes)
             elif ".csv" in nodes:
@@ -35,7 +189,9 @@ class jem:
         else:
             nodes = nodes.copy()
 
-        if not isinstance(edges, pd.DataFrame):
+        if "edges" in tables:
+            edges = tables["edges"]
+        elif not isinstance(edges, pd.DataFrame):
             if ".shp" in edges:
                 edges = gpd.read_file(edges)
             elif ".csv" in edges:
@@ -77,92 +233,183 @@ class jem:
         flows = utils.tidy(flows)
         # flows.flow = flows.flow.abs()
 
-        # ---
-        # Create infrasim cache files
-        if write:
-            utils.create_dir(path=metainfo["infrasim_cache"])
-            spatial.graph_to_csv(nodes, edges, output_dir=metainfo["infrasim_cache"])
-            flows.to_csv(metainfo["infrasim_cache"] + "flows.csv")
+        return nodes, edges, flows
+
+    def build(
+        self,
+        method="matrix",
+        flow_bounds="constraints",
+        radial=False,
+        decompose=False,
+        unique_timesteps=False,
+        slack=False,
+        junctions=False,
+        **kwargs,
+    ):
+        """
 
-        # ---
-        # add time indices to edge data
-        self.edge_indices = utils.add_time_to_edges(flows, edges)
+        Contents:
+        -------
 
-        # ---
-        # Define sets
-        self.flows = flows
-        self.edges = edges
-        self.nodes = nodes
-        self.indices = metainfo["edge_index_variables"]
-        self.constants = constants
-        self.node_types = self.nodes.asset_type.unique().tolist()
-        self.technologies = self.nodes.subtype.unique().tolist()
-        self.timesteps = self.flows.timestep.unique().tolist()
+            1. Variables
+            2. Objective Function
+            3. Generic Constraints
 
-        # ---
-        # define gurobi model
-        model_name = "infrasim"
-        self.model = gp.Model(model_name)
+        Arguments:
+        -------
 
-        # ---
-        # define model temporal resolution
-        self.temporal_resolution = metainfo["temporal_resolution"]
+            method : "matrix" adds each constraint family in bulk from sparse
+                node-arc incidence matrices, "constraints" adds constraints one
+                at a time from tupledict sums. Both produce the same LP.
+
+            flow_bounds : "constraints" adds upper_bound and lower_bound rows
+                for every arc, "variables" sets the bounds directly on the
+                arcFlows variables and drops those 2 x |arcs| rows. Big-M upper
+                bounds are left unbounded, see matrix.variable_bounds().
+
+            radial : if True, radial subtrees are left out of the LP. Their
+                sinks are joined to the meshed core by one equivalent arc each
+                and the subtree arc flows are recovered after solving, see
+                reduction.RadialReduction. Needs method="matrix".
+
+            decompose : if True, no model is built here. optimise() builds and
+                solves one LP per timestep in a pool of worker processes, see
+                decomposition.solve(). Needs method="matrix".
+
+            unique_timesteps : if True, timesteps with the same supply, demand
+                and arcs as an earlier timestep are solved once and take its
+                flows, see reduction.TimestepReduction. Needs method="matrix".
+
+            slack : if True, only the super source arcs into sinks (unmet
+                demand) and the super sink arcs out of sources (spilled supply)
+                go into the LP, as slack variables at the super arc cost. The
+                other super arcs get zero flow in results_arcflows, see
+                reduction.SlackReduction. Needs method="matrix".
+
+            junctions : if True, dead ends of junctions without sinks or
+                sources are left out of the LP and chains of junctions with
+                two neighbours are joined into one arc each way, with the
+                summed cost and the least capacity. Their arc flows are
+                recovered after solving, see reduction.JunctionReduction.
+                Needs method="matrix".
 
-        # ---
-        # print out
-        self._print = kwargs.get("print_to_console", False)
+        """
 
-        if self._print is False:
-            self.model.Params.LogToConsole = 0
+        from_id_time = time.process_time()
 
-        # ---
-        # attackable nodes
-        self.nodes_to_attack = kwargs.get("nodes_to_attack", None)
-        self.edges_to_attack = kwargs.get("edges_to_attack", None)
+        if flow_bounds not in ["constraints", "variables"]:
+            raise ValueError(f"Unrecognised flow bounds: {flow_bounds}")
 
-        # zero edges associated with attackable nodes
-        if not self.nodes_to_attack:
-            pass
+        if method == "matrix":
+            self._build_matrix(
+                flow_bounds, radial, decompose, unique_timesteps, slack, junctions
+            )
+        elif method == "constraints":
+            if radial or decompose or unique_timesteps or slack or junctions:
+                raise ValueError(
+                    "radial, decompose, unique_timesteps, slack and junctions "
+                    "require build(method='matrix')"
+                )
+            self._build_constraints(flow_bounds)
         else:
-            self.edge_indices.loc[
-                self.edge_indices.from_id.isin(self.nodes_to_attack), "max"
-            ] = 0
-            self.edge_indices.loc[
-                self.edge_indices.to_id.isin(self.nodes_to_attack), "max"
-            ] = 0
+            raise ValueError(f"Unrecognised build method: {method}")
+        self.build_method = method
+        self.flow_bounds = flow_bounds
+        self.radial = radial
+        self.slack = slack
+        self.junctions = junctions
+        self.decompose = decompose
+        self.unique_timesteps = unique_timesteps
 
-        # zero attackable edges
-        if not self.edges_to_attack:
-            pass
-        else:
-            self.edge_indices.loc[
-                self.edge_indices.id.isin(self.edges_to_attack), "max"
-            ] = 0
+        if self._print:
+            print(time.process_time() - from_id_time, "seconds")
+            print("------------- MODEL BUILD COMPLETE -------------")
 
-    def build(self, **kwargs):
-        """
+    def _build_matrix(
+        self, flow_bounds, radial, decompose, unique_timesteps, slack, junctions
+    ):
+        """Build model from sparse incidence matrices"""
 
-        Contents:
-        -------
+        # ---
+        # arcs, reduced to the LP arcs
+        self.timestep_reduction = None
+        self.reductions = []
+        if decompose:
+            # decomposition.solve() builds each timestep on its own, from the
+            # arc index, so no time expanded arc table is kept
+            self.arcs = None
+            return
+        self.arcs = matrix.arc_table(self.edge_indices, self.indices)
+        lp_arcs = self.arcs
+        network = self
+        if unique_timesteps:
+            self.timestep_reduction = reduction.TimestepReduction(
+                self.arcs, self.flows, self.timesteps
+            )
+            self.reductions.append(self.timestep_reduction)
+            lp_arcs = self.timestep_reduction.arcs
+            network = matrix.Network(
+                self.nodes,
+                self.edges,
+                self.timestep_reduction.flows,
+                self.timestep_reduction.timesteps,
+            )
+            if self._print:
+                print(
+                    f"unique timesteps: {len(network.timesteps)} "
+                    f"of {len(self.timesteps)}"
+                )
+        reductions, lp_arcs, node_table = reduction.reduce(
+            self.nodes,
+            lp_arcs,
+            network.timesteps,
+            slack=slack,
+            junctions=junctions,
+            radial=radial,
+        )
+        self.reductions += reductions
+        if self._print and reductions:
+            print(f"reduced to {len(lp_arcs)} of {len(self.arcs)} arcs")
 
-            1. Variables
-            2. Objective Function
-            3. Generic Constraints
+        # ---
+        # arcflows and constraints
+        self.arcFlows, self.baseline_ub = matrix.add_to_solver(
+            self.solver,
+            network,
+            lp_arcs,
+            flow_bounds=flow_bounds,
+            node_table=node_table,
+        )
+        self.failed = np.zeros(len(lp_arcs), dtype=bool)
 
-        """
+    def _build_constraints(self, flow_bounds):
+        """Build model one constraint at a time"""
 
-        from_id_time = time.process_time()
+        if self.solver.name != "gurobi":
+            raise ValueError("build(method='constraints') requires solver='gurobi'")
+
+        import gurobipy as gp
 
         # ======================================================================
         # VARIABLES
         # ======================================================================
 
         # ---
-        # arcflows
-        self.arc_indicies = set(
-            self.edge_indices[self.indices].set_index(keys=self.indices).index.to_list()
-        )
-        self.arcFlows = self.model.addVars(self.arc_indicies, name="arcflow")
+        # arcflows, keyed by (i, j, t) with node codes, in the order of arcs
+        self.arcs = matrix.arc_table(self.edge_indices, self.indices)
+        self.arc_indicies = ids.keys(self.arcs, self.indices)
+        if flow_bounds == "variables":
+            lb, ub = matrix.variable_bounds(self.arcs)
+            self.arcFlows = self.model.addVars(
+                self.arc_indicies,
+                lb=lb.tolist(),
+                ub=ub.tolist(),
+                name="arcflow",
+            )
+        else:
+            self.arcFlows = self.model.addVars(self.arc_indicies, name="arcflow")
+        # read the solution as one array aligned with arcs
+        self.solver.variables = gp.MVar.fromlist(list(self.arcFlows.values()))
 
         # ======================================================================
         # OBJECTIVE FUNCTION
@@ -189,10 +436,11 @@ class jem:
         # SUPER SOURCE
 
         if "super_source" in self.edges.from_id.unique():
+            super_source = int(self.node_ids.encode(["super_source"])[0])
             # constrain
             self.model.addConstrs(
                 (
-                    self.arcFlows.sum("super_source", "*", t)
+                    self.arcFlows.sum(super_source, "*", t)
                     <= constants["super_source_maximum"]
                     for t in self.timesteps
                 ),
@@ -203,9 +451,10 @@ class jem:
         # SUPER SINK
 
         if "super_sink" in self.edges.to_id.unique():
+            super_sink = int(self.node_ids.encode(["super_sink"])[0])
             # constrain
             self.model.addConstrs(
-                (self.arcFlows.sum("*", "super_sink", t) >= 0 for t in self.timesteps),
+                (self.arcFlows.sum("*", super_sink, t) >= 0 for t in self.timesteps),
                 "super_sink_demand",
             )
 
@@ -220,6 +469,7 @@ class jem:
         # get flow at supply nodes
         flow_dict = utils.get_flow_at_nodes(flows=self.flows, list_of_nodes=sources)
         flow_dict = utils.flows_as_dict(flows=flow_dict)
+        sources = self.node_ids.encode(sources).tolist()
 
         # constrain: supply from source nodes
         self.model.addConstrs(
@@ -252,6 +502,7 @@ class jem:
         # get flow at supply nodes
         flow_dict = utils.get_flow_at_nodes(flows=self.flows, list_of_nodes=sinks)
         flow_dict = utils.flows_as_dict(flows=flow_dict)
+        sinks = self.node_ids.encode(sinks).tolist()
 
         # constrain
         self.model.addConstrs(
@@ -282,6 +533,7 @@ class jem:
         junction_nodes = utils.get_node_names(
             nodes=self.nodes, index_column="asset_type", lookup="junction"
         )
+        junction_nodes = self.node_ids.encode(junction_nodes).tolist()
 
         # constrain: flow between junction nodes
         self.model.addConstrs(
@@ -293,6 +545,9 @@ class jem:
             "junc_bal",
         )
 
+        if flow_bounds == "variables":
+            return
+
         # ---
         # UPPER FLOW BOUND
 
@@ -302,7 +557,7 @@ class jem:
             (
                 self.arcFlows[i, j, t]
                 <= upper_bound[i, j, t]
-                * 10**12  # TODO check if this is relaxing all upper bounds?
+                * constants["upper_bound_scale"]  # TODO relaxes all upper bounds?
                 for i, j, t in self.arcFlows
             ),
             "upper_bound",
@@ -321,40 +576,72 @@ class jem:
             "lower_bound",
         )
 
-        if self._print:
-            print(time.process_time() - from_id_time, "seconds")
-            print("------------- MODEL BUILD COMPLETE -------------")
+    def apply_failures(self, nodes=None, edges=None):
+        """Fail nodes and edges of a built model in place
 
+        Zeroes the upper bounds of the arcFlows to or from failed nodes and of
+        failed edges, as nodes_to_attack and edges_to_attack do when the model
+        is created. optimise() then re-solves from the previous basis, and
+        reset() restores the baseline bounds.
+        """
+        failed = self._failed_variables(nodes, edges, "apply_failures")
+        idx = np.flatnonzero(failed)
+        if len(idx) > 0:
+            self.solver.set_upper_bounds(idx, 0.0)
+        self.failed |= failed
+
+    def _failed_variables(self, nodes, edges, caller):
+        """Return a mask of the LP variables newly failed by nodes and edges"""
+        if getattr(self, "build_method", None) != "matrix" or self.decompose:
+            raise ValueError(
+                f"{caller}() requires build(method='matrix', decompose=False)"
+            )
+        failed = utils.get_failed_arcs(self.arcs, nodes, edges)
+        failed = reduction.failed(self.reductions, failed)
+        return failed & ~self.failed
+
+    def reset(self):
+        """Restore the baseline upper bounds after apply_failures()"""
+        idx = np.flatnonzero(self.failed)
+        if len(idx) > 0:
+            self.solver.set_upper_bounds(idx, self.baseline_ub[idx])
+        self.failed[:] = False
 
     def optimise(self, write=False, **kwargs):
-        """Function to solve GurobiPy model"""
-        # write model to LP
-        if write:
-            self.model.write(metainfo["infrasim_cache"] + self.model.ModelName + ".lp")
-        # set output flag
-        if kwargs.get("print_to_console", False):
-            self.model.Params.LogToConsole = 1
-            self.model.setParam("OutputFlag", 1)
+        """Function to solve the model
+
+        A model built with decompose=True is solved one timestep at a time by
+        kwargs workers processes, see decomposition.solve().
+
+        results="nonzero" keeps only the arcs with positive flow in
+        results_arcflows, instead of every arc.
+        """
+        results = kwargs.get("results", "all")
+        if results not in ["all", "nonzero"]:
+            raise ValueError(f"Unrecognised results: {results}")
+
+        if self.decompose:
+            # solve each timestep on its own
+            flow = decomposition.solve(self, workers=kwargs.get("workers", None))
+            optimal = flow is not None
         else:
-            self.model.setParam("OutputFlag", 0)
-        # optimise
-        self.model.optimize()
+            # write model to LP
+            if write:
+                self.solver.write(metainfo["infrasim_cache"] + self.model_name + ".lp")
+            # optimise
+            self.solver.solve(print_to_console=kwargs.get("print_to_console", False))
+            optimal = self.solver.optimal
+            if optimal:
+                flow = self.solver.values()
+                if self.build_method == "matrix":
+                    flow = reduction.expand(self.reductions, flow)
 
         # WRITE RESULTS
         if write:
             utils.create_dir(path=metainfo["outputs_data"])
 
-        if self.model.Status == 2:
-            # arcFlows
-            arcFlows = self.model.getAttr("x", self.arcFlows)
-            keys = pd.DataFrame(
-                arcFlows.keys(), columns=["from_id", "to_id", "timestep"]
-            )
-            vals = pd.DataFrame(arcFlows.items(), columns=["key", "flow"])
-            results_arcflows = pd.concat([keys, vals], axis=1)
-            results_arcflows = results_arcflows[
-                ["from_id", "to_id", "timestep", "flow"]
-            ]
+        if optimal:
+            results_arcflows = self._results_arcflows(flow, results)
             if write:
                 # write csv
                 results_arcflows.to_csv(
@@ -365,9 +652,130 @@ class jem:
             # create subclass of results
             self.statistics = statistics(self)
 
+    def _results_arcflows(self, flow, results="all"):
+        """Return arcFlows, one column at a time from the arc table"""
+        rows = slice(None)
+        if results == "nonzero":
+            rows = np.flatnonzero(flow > 0)
+        if self.arcs is None:
+            # decomposed models read the arcs from the arc index
+            arcs = self.edge_indices
+            edges = arcs.unique(self.indices)
+            columns = {column: arcs.column(column, edges) for column in self.indices}
+        else:
+            columns = {column: self.arcs[column].array for column in self.indices}
+        results_arcflows = pd.DataFrame(
+            {column: values[rows] for column, values in columns.items()}
+        )
+        results_arcflows["flow"] = flow[rows]
+        return results_arcflows
+
+    def solve_scenarios(self, scenarios, batch_size=16, **kwargs):
+        """Return the results of failure scenarios, solved in batches
+
+        scenarios are dicts with optional "nodes" and "edges" lists of failed
+        ids. With Gurobi, each batch of batch_size scenarios is solved as one
+        multi-scenario model (see solvers.GurobiSolver.solve_scenarios()),
+        which only differ in the upper bounds of the failed arcFlows. Other
+        solvers re-solve the scenarios of a batch one at a time in place, as
+        are batched scenarios found infeasible.
+
+        Returns a list with a dict per scenario of its "status" ("optimal" or
+        "infeasible"), "objective", "results_arcflows", "statistics" and
+        "shortfall" (statistics.nodes_with_shortfall()), None when infeasible.
+        results="nonzero" keeps only the arcs with positive flow. Afterwards
+        the network holds the results_arcflows and statistics of the last
+        optimal scenario.
+        """
+        results = kwargs.get("results", "all")
+        if results not in ["all", "nonzero"]:
+            raise ValueError(f"Unrecognised results: {results}")
+
+        outcomes = []
+        for start in range(0, len(scenarios), batch_size):
+            batch = scenarios[start : start + batch_size]
+            failed = [
+                np.flatnonzero(
+                    self._failed_variables(
+                        scenario.get("nodes", None),
+                        scenario.get("edges", None),
+                        "solve_scenarios",
+                    )
+                )
+                for scenario in batch
+            ]
+            if hasattr(self.solver, "solve_scenarios"):
+                solutions = self.solver.solve_scenarios([(idx, 0.0) for idx in failed])
+            else:
+                solutions = [None] * len(batch)
+            for solution, idx in zip(solutions, failed):
+                if solution is None:
+                    # also confirms scenarios found infeasible in a batch, where
+                    # the big-M bounds and super arc costs can mislead the search
+                    solution = self._solve_failed(idx)
+                outcomes.append(self._scenario_outcome(solution, results))
+        return outcomes
+
+    def _scenario_outcome(self, solution, results):
+        """Return the outcome dict of a (solution, objective) pair or None"""
+        outcome = {
+            "status": "infeasible",
+            "objective": None,
+            "results_arcflows": None,
+            "statistics": None,
+            "shortfall": None,
+        }
+        if solution is not None:
+            values, objective = solution
+            flow = reduction.expand(self.reductions, values)
+            self.results_arcflows = self._results_arcflows(flow, results)
+            self.statistics = statistics(self)
+            outcome["status"] = "optimal"
+            outcome["objective"] = objective
+            outcome["results_arcflows"] = self.results_arcflows
+            outcome["statistics"] = self.statistics
+            outcome["shortfall"] = self.statistics.nodes_with_shortfall()
+        return outcome
+
+    def _solve_failed(self, idx):
+        """Return (solution, objective) with variables idx failed, or None"""
+        self.solver.set_upper_bounds(idx, 0.0)
+        try:
+            self.solver.solve()
+            if not self.solver.optimal:
+                return None
+            return self.solver.values(), self.solver.objective
+        finally:
+            self.solver.set_upper_bounds(idx, self.baseline_ub[idx])
+
+    def sweep(self, scenarios, workers=None, **kwargs):
+        """Yield impact records of failure scenarios, see sweeps.sweep()"""
+        from . import sweeps
+
+        return sweeps.sweep(self, scenarios, workers=workers, **kwargs)
+
+    @property
+    def edge_positions(self):
+        """graph.NodeArcs of edges, built on first use"""
+        index = getattr(self, "_edge_positions", None)
+        if index is None or index.table is not self.edges:
+            index = self._edge_positions = graph.NodeArcs(self.edges, self.node_ids.ids)
+        return index
+
+    @property
+    def flow_positions(self):
+        """graph.NodeArcs of results_arcflows, built on first use after optimise()"""
+        index = getattr(self, "_flow_positions", None)
+        if index is None or index.table is not self.results_arcflows:
+            index = self._flow_positions = graph.NodeArcs(
+                self.results_arcflows, self.node_ids.ids, self.timesteps
+            )
+        return index
+
     def debug(self):
         """
         Compute model Irreducible Inconsistent Subsystem (IIS) to help deal with infeasibilies
+
+        Needs solver="gurobi".
         """
-        self.model.computeIIS()
-        self.model.write(metainfo["infrasim_cache"] + "model-debug-report.ilp")
\ No newline at end of file
+        self.solver.debug(metainfo["infrasim_cache"] + "model-debug-report.ilp")
\ No newline at end of file
@@ -10,5 +10,6 @@ variables = {}
 
 constants = {
     "super_source_maximum": 10**12,
+    "upper_bound_scale": 10**12,
     "mask_value": -999,
 }
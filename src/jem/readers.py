@@ -0,0 +1,71 @@
+"""
+    readers.py
+        Fast readers of jem network files
+
+        The LP only needs a few attribute columns of the nodes and edges, so
+        GIS files are read with pyogrio column projection, through Arrow and
+        without geometry. Geometry is read separately, when a spatial export
+        asks for it.
+"""
+
+import os
+
+import pyogrio
+
+from .meta import metainfo
+
+# extensions read with pyogrio, and whether the file holds named layers
+gis_files = {".shp": False, ".gpkg": True}
+
+
+def is_gis_file(path):
+    return any(extension in path for extension in gis_files)
+
+
+def layer(path, kind):
+    """Return the layer of nodes or edges in path, None for single layer files"""
+    for extension, layered in gis_files.items():
+        if extension in path:
+            return kind if layered else None
+    raise ValueError(f"Unrecognised file extension: {path}")
+
+
+def read_table(path, kind, columns=None):
+    """Return the model columns of a nodes or edges file, without geometry
+
+    columns defaults to metainfo["<kind>_model_columns"]. Columns missing
+    from the file are skipped.
+    """
+    path = os.fspath(path)
+    if columns is None:
+        columns = metainfo[f"{kind}_model_columns"]
+    fields = pyogrio.read_info(path, layer=layer(path, kind))["fields"]
+    return pyogrio.read_dataframe(
+        path,
+        layer=layer(path, kind),
+        columns=[column for column in columns if column in fields],
+        read_geometry=False,
+        use_arrow=True,
+    )
+
+
+def read_tables(paths, columns=None):
+    """Return {kind: table} of the model columns of nodes and edges files
+
+    paths maps "nodes" and "edges" to their files, and columns optionally
+    maps them to the columns to read, see read_table().
+    """
+    columns = columns or {}
+    return {
+        kind: read_table(path, kind, columns.get(kind, None))
+        for kind, path in paths.items()
+    }
+
+
+def read_geometry(path, kind):
+    """Return the geometry of a nodes or edges file as a GeoSeries"""
+    path = os.fspath(path)
+    frame = pyogrio.read_dataframe(
+        path, layer=layer(path, kind), columns=[], use_arrow=True
+    )
+    return frame.geometry
@@ -0,0 +1,527 @@
+"""
+    reduction.py
+        Network reductions that shrink the LP before it is built
+
+        Radial subtrees hang off the meshed core through a single root node
+        and hold no sources. Every sink in a subtree can only be supplied
+        along its unique path from the root, so the LP connects each subtree
+        sink to its root by one equivalent arc and the subtree junctions are
+        left out. Tree arc flows are recovered after solving by accumulating
+        the flow delivered to the sinks up the tree, leaves first.
+
+        Junctions only pass flow on. Dead ends of junctions without sinks or
+        sources carry no flow and are left out, and a chain of junctions with
+        two neighbours each carries the same flow on all of its arcs, so each
+        chain is joined into one arc each way with the summed cost and the
+        least capacity. Chain arc flows are recovered by copying the flow of
+        its joined arc onto every arc of the chain.
+
+        Timesteps that repeat the supply, demand and arcs of an earlier
+        timestep have the same optimal flows, so only the first of each
+        distinct timestep is kept in the LP.
+
+        Super source arcs are only used to meet demand at sinks and super
+        sink arcs only to spill supply at sources, so the other super arcs
+        can be left out and those kept act as slacks on sinks and sources.
+
+        Every reduction maps failed arcs onto its LP arcs with failed() and
+        LP flows back onto its arcs with expand().
+"""
+
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+from .meta import metainfo
+from .params import constants
+from . import graph
+from . import ids
+from . import matrix
+
+
+def peel_leaves(n, u, v, peelable):
+    """Return (parent, rounds) of nodes removed by repeatedly peeling leaves
+
+    u and v are the end nodes of unique undirected links between n nodes. A
+    peelable node with one remaining neighbour is removed and that neighbour
+    becomes its parent. rounds holds the nodes removed by each pass, so the
+    concatenated rounds are a topological order from the leaves up.
+    """
+    indptr, order = graph.csr(n, np.concatenate([u, v]))
+    nbrs = np.concatenate([v, u])[order]
+    degree = np.diff(indptr)
+    alive = np.ones(n, dtype=bool)
+    parent = np.full(n, -1)
+    rounds = []
+
+    leaves = np.flatnonzero(peelable & (degree == 1))
+    while len(leaves) > 0:
+        # remaining neighbour of every leaf
+        owner, position = graph.neighbours(indptr, leaves)
+        candidate = nbrs[position]
+        remaining = alive[candidate]
+        owner, candidate = owner[remaining], candidate[remaining]
+
+        # of two leaves joined to each other, the lower one stays as a root
+        is_leaf = np.zeros(n, dtype=bool)
+        is_leaf[leaves] = True
+        peel = ~(is_leaf[candidate] & (owner < candidate))
+        owner, candidate = owner[peel], candidate[peel]
+
+        parent[owner] = candidate
+        alive[owner] = False
+        degree -= np.bincount(candidate, minlength=n)
+        rounds.append(owner)
+
+        candidate = np.unique(candidate)
+        leaves = candidate[peelable[candidate] & alive[candidate]]
+        leaves = leaves[degree[leaves] == 1]
+
+    return parent, rounds
+
+
+def static_arcs(arcs, timesteps, name):
+    """Return the arcs of one timestep of a table with the same arcs in each"""
+    n_timesteps = len(timesteps)
+    n_arcs = len(arcs) // n_timesteps
+    if n_arcs * n_timesteps != len(arcs):
+        raise ValueError(f"{name} reduction needs the same arcs in every timestep")
+    columns = [
+        metainfo["i_field"],
+        metainfo["j_field"],
+        metainfo["cost_column"],
+        metainfo["lower_bound"],
+        metainfo["upper_bound"],
+    ]
+    for column in columns:
+        values = arcs[column].to_numpy().reshape(n_timesteps, -1)
+        if not (values == values[0]).all():
+            raise ValueError(f"{name} reduction needs the same arcs in every timestep")
+    return arcs.iloc[:n_arcs].drop(columns="timestep").reset_index(drop=True)
+
+
+def expand_timesteps(static, timesteps):
+    """Return a time expanded arc table of the same arcs in every timestep"""
+    return pd.concat([static.assign(timestep=t) for t in timesteps], ignore_index=True)
+
+
+def reduce(nodes, arcs, timesteps, slack=False, junctions=False, radial=False):
+    """Return (reductions, LP arcs, node table) after the chosen reductions"""
+    reductions = []
+    node_table = nodes
+    if slack:
+        reductions.append(SlackReduction(nodes, arcs))
+        arcs = reductions[-1].arcs
+    if junctions:
+        reductions.append(JunctionReduction(nodes, arcs, timesteps))
+        arcs = reductions[-1].arcs
+        node_table = reductions[-1].node_table(node_table)
+    if radial:
+        reductions.append(RadialReduction(nodes, arcs, timesteps))
+        arcs = reductions[-1].arcs
+        node_table = reductions[-1].node_table(node_table)
+    return reductions, arcs, node_table
+
+
+def failed(reductions, failed_arcs):
+    """Return the LP arcs to fail after a list of reductions"""
+    for reduction in reductions:
+        failed_arcs = reduction.failed(failed_arcs)
+    return failed_arcs
+
+
+def expand(reductions, flows):
+    """Return flows on the original arcs from the LP flows of reductions"""
+    for reduction in reversed(reductions):
+        flows = reduction.expand(flows)
+    return flows
+
+
+class SlackReduction:
+    """Super arcs of a time expanded arc table kept as nodal slacks
+
+    Super source arcs into sinks are kept as unmet demand and super sink arcs
+    out of sources as spilled supply. Super arcs of other nodes only cost more
+    than those of the sinks and sources they would pass flow to, so they are
+    left out, unless the node has an arc with a lower bound that could force
+    flow into or out of it.
+    """
+
+    def __init__(self, nodes, arcs):
+        i = arcs[metainfo["i_field"]]
+        j = arcs[metainfo["j_field"]]
+        from_super = (i == "super_source").to_numpy()
+        to_super = (j == "super_sink").to_numpy()
+
+        sinks = nodes.id[nodes.asset_type == "sink"]
+        sources = nodes.id[nodes.asset_type == "source"]
+        bounded = arcs[arcs[metainfo["lower_bound"]] > 0]
+        forced = pd.concat([bounded[metainfo["i_field"]], bounded[metainfo["j_field"]]])
+
+        slack_in = from_super & j.isin(pd.concat([sinks, forced])).to_numpy()
+        slack_out = to_super & i.isin(pd.concat([sources, forced])).to_numpy()
+        self.n_arcs = len(arcs)
+        self.kept = np.flatnonzero(~(from_super | to_super) | slack_in | slack_out)
+        self.arcs = arcs.iloc[self.kept].reset_index(drop=True)
+
+    def failed(self, failed_arcs):
+        """Return the LP arcs to fail for a mask of failed arcs"""
+        return failed_arcs[self.kept]
+
+    def expand(self, flows):
+        """Return flows on every arc from the flows on the LP arcs"""
+        results = np.zeros(self.n_arcs)
+        results[self.kept] = flows
+        return results
+
+
+class JunctionReduction:
+    """Junction chains and dead ends of a time expanded arc table
+
+    arcs must hold the same static arcs in every timestep block, as made by
+    matrix.arc_table(). Junctions with an arc that has a lower bound or a
+    negative cost are kept as they are.
+    """
+
+    def __init__(self, nodes, arcs, timesteps):
+        self.timesteps = timesteps
+        self.n_timesteps = len(timesteps)
+        self.static = static_arcs(arcs, timesteps, "junction")
+        self.n_arcs = len(self.static)
+
+        # ---
+        # node codes and types
+        self.node_index = matrix.node_index(nodes, self.static)
+        n = len(self.node_index)
+        asset_type = graph.asset_types(self.node_index, nodes)
+
+        i = ids.positions(self.node_index, self.static[metainfo["i_field"]])
+        j = ids.positions(self.node_index, self.static[metainfo["j_field"]])
+        lb = self.static[metainfo["lower_bound"]].to_numpy(dtype="float64")
+        upper = self.static[metainfo["upper_bound"]].to_numpy(dtype="float64")
+        length = self.static[metainfo["cost_column"]].to_numpy(dtype="float64")
+
+        # ---
+        # junctions free to reduce, linked by the real (non super) arcs
+        is_super = graph.super_arcs(self.node_index, i, j)
+        real = ~is_super & (i != j)
+        pinned = ~is_super & ((lb > 0) | (length < 0))
+        free = asset_type == "junction"
+        free[i[pinned]] = False
+        free[j[pinned]] = False
+        links = np.unique(
+            np.stack([np.minimum(i[real], j[real]), np.maximum(i[real], j[real])]),
+            axis=1,
+        )
+
+        # dead ends: junction subtrees that hold no sinks or sources
+        parent, _ = peel_leaves(n, links[0], links[1], free)
+        self.dead = parent >= 0
+        u, v = links[:, ~(self.dead[links[0]] | self.dead[links[1]])]
+        indptr, order = graph.csr(n, np.concatenate([u, v]))
+        nbrs = np.concatenate([v, u])[order]
+        degree = np.diff(indptr)
+        self.dead |= free & (degree == 0)
+
+        # ---
+        # walk every chain of junctions with two neighbours from both ends
+        chain = free & ~self.dead & (degree == 2)
+        nb = np.full((n, 2), -1)
+        nb[chain] = nbrs[indptr[:-1][chain, None] + [0, 1]]
+        into = chain[v] & ~chain[u]
+        out_of = chain[u] & ~chain[v]
+        start = np.concatenate([u[into], v[out_of]])
+        first = np.concatenate([v[into], u[out_of]])
+        end = np.empty_like(start)
+        walk = np.arange(len(start))
+        prev, cur = start, first
+        steps = []
+        while len(walk) > 0:
+            steps.append((walk, prev, cur))
+            going = chain[cur]
+            end[walk[~going]] = cur[~going]
+            walk, prev, cur = walk[going], prev[going], cur[going]
+            prev, cur = cur, np.where(nb[cur, 0] != prev, nb[cur, 0], nb[cur, 1])
+        walk, a, b = (np.concatenate(column) for column in zip(*steps))
+
+        # contract each chain once, unless its ends are already joined
+        joined = pd.Series(start.astype("int64") * n + end)
+        clear = ~(chain[u] | chain[v])
+        taken = u[clear].astype("int64") * n + v[clear]
+        contract = (start < end) & ~joined.isin(taken).to_numpy()
+        contract &= ~joined.where(contract).duplicated(keep=False).to_numpy()
+        self.contracted = np.zeros(n, dtype=bool)
+        self.contracted[b[contract[walk] & chain[b]]] = True
+
+        # ---
+        # equivalent arc of each chain in each direction with an arc every step
+        key = pd.Index(i.astype("int64") * n + j)
+        chains = np.flatnonzero(contract)
+        position = np.full(len(start), -1)
+        position[chains] = np.arange(len(chains))
+        on_chain = contract[walk]
+        walk, a, b = position[walk[on_chain]], a[on_chain], b[on_chain]
+        member_arc, member_of, shortcuts = [], [], []
+        i_dtype = self.static[metainfo["i_field"]].dtype
+        for tail, head, found in [
+            (start[chains], end[chains], key.get_indexer(a.astype("int64") * n + b)),
+            (end[chains], start[chains], key.get_indexer(b.astype("int64") * n + a)),
+        ]:
+            complete = np.bincount(walk, found < 0, len(chains)) == 0
+            members = complete[walk]
+            capacity = np.full(len(chains), np.inf)
+            np.minimum.at(capacity, walk[members], upper[found[members]])
+            offset = sum(len(frame) for frame in shortcuts)
+            number = np.cumsum(complete) - 1 + offset
+            member_arc.append(found[members])
+            member_of.append(number[walk[members]])
+            shortcuts.append(
+                pd.DataFrame(
+                    {
+                        metainfo["i_field"]: ids.labels(
+                            self.node_index, tail[complete], i_dtype
+                        ),
+                        metainfo["j_field"]: ids.labels(
+                            self.node_index, head[complete], i_dtype
+                        ),
+                        metainfo["cost_column"]: np.bincount(
+                            walk[members], length[found[members]], len(chains)
+                        )[complete],
+                        metainfo["lower_bound"]: 0,
+                        metainfo["upper_bound"]: capacity[complete],
+                    }
+                )
+            )
+        self.member_arc = np.concatenate(member_arc)
+        self.member_of = np.concatenate(member_of)
+
+        # ---
+        # LP arcs: arcs clear of the reduced junctions and the chain arcs
+        reduced = self.dead | self.contracted
+        self.kept = np.flatnonzero(~(reduced[i] | reduced[j]))
+        lp_static = pd.concat(
+            [self.static.iloc[self.kept], *shortcuts], ignore_index=True
+        )
+        self.n_lp_arcs = len(lp_static)
+        self.arcs = expand_timesteps(lp_static, timesteps)
+
+    @property
+    def junctions(self):
+        """Return ids of the junctions left out of the LP"""
+        return self.node_index[self.dead | self.contracted].to_list()
+
+    def node_table(self, nodes):
+        """Return the nodes that keep their nodal constraints in the LP"""
+        return nodes[~nodes.id.isin(self.junctions)]
+
+    def failed(self, failed_arcs):
+        """Return the LP arcs to fail for a mask of failed arcs"""
+        failed_arcs = failed_arcs.reshape(self.n_timesteps, self.n_arcs).T
+        cut = np.zeros((self.n_lp_arcs - len(self.kept), self.n_timesteps), dtype=bool)
+        np.logical_or.at(cut, self.member_of, failed_arcs[self.member_arc])
+        lp = np.concatenate([failed_arcs[self.kept], cut])
+        return lp.T.ravel()
+
+    def expand(self, flows):
+        """Return flows on every arc from the flows on the LP arcs"""
+        flows = flows.reshape(self.n_timesteps, self.n_lp_arcs).T
+        results = np.zeros((self.n_arcs, self.n_timesteps))
+        results[self.kept] = flows[: len(self.kept)]
+        results[self.member_arc] = flows[len(self.kept) + self.member_of]
+        return results.T.ravel()
+
+
+class RadialReduction:
+    """Radial subtrees of a time expanded arc table
+
+    arcs must hold the same static arcs in every timestep block, as made by
+    matrix.arc_table(). Subtrees are only formed across arcs that are
+    uncapacitated (big-M upper bounds) or failed, with zero lower bounds.
+    """
+
+    def __init__(self, nodes, arcs, timesteps):
+        self.timesteps = timesteps
+        self.n_timesteps = len(timesteps)
+        self.static = static_arcs(arcs, timesteps, "radial")
+        self.n_arcs = len(self.static)
+
+        # ---
+        # node codes and types
+        self.node_index = matrix.node_index(nodes, self.static)
+        n = len(self.node_index)
+        asset_type = graph.asset_types(self.node_index, nodes)
+        self.is_sink = asset_type == "sink"
+        is_junction = asset_type == "junction"
+
+        i = ids.positions(self.node_index, self.static[metainfo["i_field"]])
+        j = ids.positions(self.node_index, self.static[metainfo["j_field"]])
+        self.i, self.j = i, j
+        lb = self.static[metainfo["lower_bound"]].to_numpy(dtype="float64")
+        upper = self.static[metainfo["upper_bound"]].to_numpy(dtype="float64")
+        ub = upper * constants["upper_bound_scale"]
+        self.usable = ub >= constants["super_source_maximum"]
+
+        # ---
+        # peel radial subtrees from the real (non super) arcs
+        is_super = graph.super_arcs(self.node_index, i, j)
+        real = ~is_super & (i != j)
+        pinned = real & ((lb > 0) | ~(self.usable | (ub <= 0)))
+        peelable = self.is_sink | is_junction
+        peelable[i[pinned]] = False
+        peelable[j[pinned]] = False
+        links = np.unique(
+            np.stack([np.minimum(i[real], j[real]), np.maximum(i[real], j[real])]),
+            axis=1,
+        )
+        self.parent, self.rounds = peel_leaves(n, links[0], links[1], peelable)
+        self.peeled = self.parent >= 0
+
+        # arc from parent to each peeled node
+        key = pd.Index(i[real].astype("int64") * n + j[real])
+        found = key.get_indexer(np.maximum(self.parent, 0) * n + np.arange(n))
+        self.parent_arc = np.where(
+            self.peeled & (found >= 0), np.flatnonzero(real)[found], -1
+        )
+
+        # ---
+        # walk each subtree from its root
+        self.connected = np.zeros(n, dtype=bool)
+        self.root = np.arange(n)
+        length = self.static[metainfo["cost_column"]].to_numpy(dtype="float64")
+        self.length = np.zeros(n)
+        self.capacity = np.full(n, np.inf)
+        for p in reversed(self.rounds):
+            q = self.parent[p]
+            a = self.parent_arc[p]
+            from_peeled = self.peeled[q]
+            relay = ~self.is_sink[q] & np.where(from_peeled, self.connected[q], True)
+            exists = a >= 0
+            self.connected[p] = exists & self.usable[a] & relay
+            self.root[p] = self.root[q]
+            self.length[p] = np.where(from_peeled, self.length[q], 0)
+            self.length[p] += np.where(exists, length[a], 0)
+            self.capacity[p] = np.minimum(
+                np.where(from_peeled, self.capacity[q], np.inf),
+                np.where(exists, upper[a], 0),
+            )
+
+        # ---
+        # LP arcs: arcs clear of the subtrees, super arcs of subtree sinks
+        # and one equivalent arc from the root to every connected subtree sink
+        touches = self.peeled[i] | self.peeled[j]
+        sink_super = is_super & (self.is_sink[i] | self.is_sink[j])
+        self.kept = np.flatnonzero(~touches | sink_super)
+        self.sinks = np.flatnonzero(self.peeled & self.is_sink & self.connected)
+        i_dtype = self.static[metainfo["i_field"]].dtype
+        shortcuts = pd.DataFrame(
+            {
+                metainfo["i_field"]: ids.labels(
+                    self.node_index, self.root[self.sinks], i_dtype
+                ),
+                metainfo["j_field"]: ids.labels(self.node_index, self.sinks, i_dtype),
+                metainfo["cost_column"]: self.length[self.sinks],
+                metainfo["lower_bound"]: 0,
+                metainfo["upper_bound"]: self.capacity[self.sinks],
+            }
+        )
+        lp_static = pd.concat(
+            [self.static.iloc[self.kept], shortcuts], ignore_index=True
+        )
+        self.n_lp_arcs = len(lp_static)
+        self.arcs = expand_timesteps(lp_static, timesteps)
+
+    @property
+    def junctions(self):
+        """Return ids of the subtree junctions left out of the LP"""
+        return self.node_index[self.peeled & ~self.is_sink].to_list()
+
+    def node_table(self, nodes):
+        """Return the nodes that keep their nodal constraints in the LP"""
+        return nodes[~nodes.id.isin(self.junctions)]
+
+    def failed(self, failed_arcs):
+        """Return the LP arcs to fail for a mask of failed arcs"""
+        failed_arcs = failed_arcs.reshape(self.n_timesteps, self.n_arcs).T
+        cut = np.zeros((len(self.node_index), self.n_timesteps), dtype=bool)
+        for p in reversed(self.rounds):
+            q = self.parent[p]
+            a = self.parent_arc[p]
+            cut[p] = np.where((a >= 0)[:, None], failed_arcs[a], False)
+            cut[p] |= np.where(self.peeled[q][:, None], cut[q], False)
+        lp = np.concatenate([failed_arcs[self.kept], cut[self.sinks]])
+        return lp.T.ravel()
+
+    def expand(self, flows):
+        """Return flows on every arc from the flows on the LP arcs"""
+        flows = flows.reshape(self.n_timesteps, self.n_lp_arcs).T
+        results = np.zeros((self.n_arcs, self.n_timesteps))
+        results[self.kept] = flows[: len(self.kept)]
+
+        # accumulate delivered flow up the subtrees, leaves first
+        subtree = np.zeros((len(self.node_index), self.n_timesteps))
+        subtree[self.sinks] = flows[len(self.kept) :]
+        for p in self.rounds:
+            a = self.parent_arc[p]
+            results[a[a >= 0]] = subtree[p[a >= 0]]
+            np.add.at(subtree, self.parent[p], subtree[p])
+        return results.T.ravel()
+
+
+class TimestepReduction:
+    """Distinct timesteps of a time expanded arc table
+
+    Each timestep is hashed on its nodal flows and its arcs. Timesteps with
+    the same hash as an earlier timestep are left out of the LP and take the
+    flows of that timestep.
+    """
+
+    def __init__(self, arcs, flows, timesteps):
+        columns = [
+            metainfo["i_field"],
+            metainfo["j_field"],
+            metainfo["cost_column"],
+            metainfo["lower_bound"],
+            metainfo["upper_bound"],
+        ]
+        position = pd.Index(timesteps).get_indexer(arcs.timestep)
+        nodal = flows.pivot(index="timestep", columns="node", values="flow")
+        flow_hash = pd.util.hash_pandas_object(
+            nodal.reindex(timesteps), index=False
+        ).to_numpy()
+
+        # hash the sequence of arcs in each timestep
+        row_hash = pd.util.hash_pandas_object(arcs[columns], index=False).to_numpy()
+        order = np.argsort(position, kind="stable")
+        bounds = np.searchsorted(position[order], np.arange(len(timesteps) + 1))
+        arc_hash = [
+            hashlib.blake2b(row_hash[order[a:b]].tobytes()).hexdigest()
+            for a, b in zip(bounds[:-1], bounds[1:])
+        ]
+
+        key = pd.Series(flow_hash.astype(str)) + pd.Series(arc_hash)
+        self.codes, _ = pd.factorize(key)
+        first = np.unique(self.codes, return_index=True)[1]
+        self.timesteps = [timesteps[k] for k in first]
+
+        # LP arcs and flows of the distinct timesteps
+        kept = order[np.isin(position[order], first)]
+        self.arcs = arcs.iloc[kept].reset_index(drop=True)
+        self.flows = flows[flows.timestep.isin(self.timesteps)]
+
+        # position of every arc in the LP arcs
+        rank = np.empty(len(arcs), dtype="int64")
+        rank[order] = np.arange(len(arcs)) - bounds[position[order]]
+        size = bounds[1:] - bounds[:-1]
+        offset = np.concatenate([[0], np.cumsum(size[first])])
+        self.index = offset[self.codes[position]] + rank
+
+    def failed(self, failed_arcs):
+        """Return the LP arcs to fail for a mask of failed arcs"""
+        lp = np.zeros(len(self.arcs), dtype=bool)
+        lp[self.index[failed_arcs]] = True
+        return lp
+
+    def expand(self, flows):
+        """Return flows on every arc from the flows on the LP arcs"""
+        return flows[self.index]
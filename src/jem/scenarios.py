@@ -0,0 +1,105 @@
+"""
+    scenarios.py
+        Failure scenarios solved on a single built jem model
+"""
+
+from . import graph
+from . import utils
+
+
+class ScenarioRunner:
+    """Re-solve failure scenarios on one built jem model
+
+    The network is built once. Each scenario zeroes the upper bounds of the
+    failed arcs in place, re-optimises from the previous basis and restores
+    the baseline bounds afterwards.
+
+    With screen=True the baseline is solved once, and scenarios that only fail
+    arcs carrying no baseline flow return the baseline shortfall without a
+    solve: removing those arcs leaves the baseline solution optimal.
+
+    With connectivity=True scenarios are first checked with a search from
+    the sources (graph.Connectivity). When the sinks still reached cannot be
+    capacity-limited, the shortfall is the demand of the sinks cut off and
+    the LP is not solved. These scenarios have no arc flows, so the network
+    results_arcflows and statistics are set to None.
+
+    After each scenario the network holds its results_arcflows and statistics,
+    and objective holds its objective value (None if the LP was not solved).
+    Scenarios are dicts with optional "nodes" and "edges" lists of failed ids.
+    """
+
+    def __init__(self, network, screen=True, connectivity=False, **kwargs):
+        self.network = network
+        if getattr(network, "build_method", None) is None:
+            network.build(**kwargs)
+        self.screen = screen
+        self.connectivity = graph.Connectivity(network) if connectivity else None
+        self.baseline_results = None
+        self.baseline_statistics = None
+        self.baseline_flows = None
+        self.baseline_shortfall = None
+        self.baseline_objective = None
+        self.objective = None
+        self.screened = 0
+        self.disconnected = 0
+        self.solved = 0
+
+    def baseline(self):
+        """Solve the network without failures and keep its flows"""
+        self.network.reset()
+        self.network.optimise()
+        self.baseline_results = self.network.results_arcflows
+        self.baseline_statistics = self.network.statistics
+        self.baseline_flows = self.baseline_results.flow.to_numpy()
+        self.baseline_shortfall = self.network.statistics.nodes_with_shortfall()
+        self.baseline_objective = self.network.solver.objective
+        return self.baseline_shortfall
+
+    def solve(self, nodes=None, edges=None):
+        """Return nodes with shortfall when nodes and edges fail
+
+        Returns None if the scenario has no optimal solution, e.g. when a sink
+        is failed and its demand can no longer be met.
+        """
+        if self.screen:
+            if self.baseline_flows is None:
+                self.baseline()
+            failed = utils.get_failed_arcs(self.network.arcs, nodes, edges)
+            if not (self.baseline_flows[failed] > 0).any():
+                self.screened += 1
+                self.objective = self.baseline_objective
+                self.network.results_arcflows = self.baseline_results
+                self.network.statistics = self.baseline_statistics
+                return self.baseline_shortfall.copy()
+
+        if self.connectivity is not None:
+            shortfall = self.connectivity.shortfall(nodes=nodes, edges=edges)
+            if shortfall is not None:
+                self.disconnected += 1
+                self.objective = None
+                self.network.results_arcflows = None
+                self.network.statistics = None
+                return shortfall
+
+        self.network.apply_failures(nodes=nodes, edges=edges)
+        try:
+            self.network.optimise()
+            self.solved += 1
+            self.objective = None
+            if not self.network.solver.optimal:
+                return None
+            self.objective = self.network.solver.objective
+            return self.network.statistics.nodes_with_shortfall()
+        finally:
+            self.network.reset()
+
+    def run(self, scenarios):
+        """Yield (scenario, nodes with shortfall) for each scenario"""
+        for scenario in scenarios:
+            yield scenario, self.solve(**scenario)
+        if self.network._print:
+            print(
+                f"{self.screened} scenarios screened out, "
+                f"{self.disconnected} decided by connectivity, {self.solved} solved"
+            )
@@ -0,0 +1,156 @@
+"""
+    shared.py
+        Preprocessed jem networks shared between processes
+
+        publish() writes the nodes, edges and flows of a jem network, after
+        the super arcs are added, the flows tidied and the ids interned, as one
+        .npy array per column. String columns are stored as integer codes and
+        categories. Worker processes attach() to the arrays as read-only memory
+        maps, so the pages are shared by every worker through the page cache
+        and no worker reads, parses or copies the network. The arc index
+        (arcs.ArcIndex) is published alongside, so bounds set on the arcs
+        after preprocessing, e.g. per timestep caps, reach every worker.
+"""
+
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from . import ids
+from .model import jem
+
+tables = ["nodes", "edges", "flows"]
+
+# static edge attributes of the arc index, published as a table
+arc_table = "arcs"
+
+
+class SharedNetwork:
+    """Handle of a published network, small enough to pass to workers
+
+    Use as a context manager, or call release(), to remove the arrays once
+    the workers are done.
+    """
+
+    def __init__(self, directory, schema, sources=None):
+        self.directory = directory
+        # per table, a list of (column, categories or None)
+        self.schema = schema
+        # GIS files to read geometry from, see jem.geometry()
+        self.sources = sources or {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.release()
+
+    def path(self, name):
+        return os.path.join(self.directory, name + ".npy")
+
+    def tables(self):
+        """Return (nodes, edges, flows) as DataFrames over the memory maps"""
+        dtypes = {}
+        return tuple(self.table(table, dtypes) for table in tables)
+
+    def arcs(self):
+        """Return the static table and varying arrays of the arc index
+
+        The varying (|T|, |E|) arrays are mapped copy-on-write, so a worker
+        setting bounds of its own only copies the pages it changes.
+        """
+        static = self.table(arc_table, {}).copy()
+        varying = {
+            column: np.load(self.path(f"{arc_table}.varying.{column}"), mmap_mode="c")
+            for column in self.schema["varying"]
+        }
+        return static, varying
+
+    def table(self, table, dtypes):
+        """Return a published table as a DataFrame over the memory maps
+
+        dtypes holds the categorical dtypes read so far, by categories name.
+        """
+        columns = {}
+        for column, categories in self.schema[table]:
+            values = np.load(self.path(f"{table}.{column}"), mmap_mode="r")
+            if categories is not None:
+                if categories not in dtypes:
+                    labels = np.load(self.path(categories), allow_pickle=False)
+                    dtypes[categories] = pd.CategoricalDtype(pd.Index(labels))
+                values = pd.Categorical.from_codes(
+                    values, dtype=dtypes[categories], validate=False
+                )
+            columns[column] = values
+        return pd.DataFrame(columns, copy=False)
+
+    def release(self):
+        """Remove the published arrays"""
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def shared_dir():
+    """Return a directory for the arrays, in memory where the OS offers one"""
+    if os.path.isdir("/dev/shm"):
+        return "/dev/shm"
+    return None
+
+
+def publish(network, directory=None):
+    """Write the tables of a jem network as arrays and return their handle"""
+    directory = tempfile.mkdtemp(prefix="jem-", dir=directory or shared_dir())
+    schema = {}
+    categories = []
+    frames = [network.nodes, network.edges, network.flows]
+    frames.append(network.edge_indices.static)
+    for table, frame in zip(tables + [arc_table], frames):
+        schema[table] = []
+        for column in frame.columns:
+            values = frame[column]
+            if column == "geometry":
+                continue
+            name = None
+            if values.dtype == object or pd.api.types.is_string_dtype(values):
+                values = values.astype("category")
+            if ids.interned(values):
+                # columns over the same ids share one categories array
+                dtype = values.dtype
+                for k, other in enumerate(categories):
+                    if other == dtype:
+                        break
+                else:
+                    k = len(categories)
+                    categories.append(dtype)
+                    labels = dtype.categories.to_numpy()
+                    if labels.dtype == object:
+                        labels = labels.astype(str)
+                    np.save(os.path.join(directory, f"categories.{k}.npy"), labels)
+                name = f"categories.{k}"
+                values = values.cat.codes
+            values = values.to_numpy()
+            if values.dtype == object:
+                raise ValueError(f"Cannot share column {table}.{column}")
+            np.save(os.path.join(directory, f"{table}.{column}.npy"), values)
+            schema[table].append((column, name))
+
+    schema["varying"] = []
+    for column, values in network.edge_indices.varying.items():
+        np.save(os.path.join(directory, f"{arc_table}.varying.{column}.npy"), values)
+        schema["varying"].append(column)
+    return SharedNetwork(directory, schema, sources=getattr(network, "sources", None))
+
+
+def attach(shared, **kwargs):
+    """Return a jem model over the tables of a published network
+
+    kwargs are passed to jem, e.g. solver or nodes_to_attack. Options that
+    change preprocessing, such as super_source, were fixed by publish().
+    """
+    nodes, edges, flows = shared.tables()
+    network = jem(nodes, edges, flows, preprocessed=True, **kwargs)
+    network.sources = dict(shared.sources)
+    network.edge_indices.static, network.edge_indices.varying = shared.arcs()
+    return network
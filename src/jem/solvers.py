@@ -0,0 +1,212 @@
+"""
+    solvers.py
+        LP solver backends for the sparse matrix form of the INFRASIM model
+
+        Backends take the arc flow variables as cost and bound arrays and the
+        constraints as (A, sense, rhs) blocks from matrix.constraint_blocks().
+        Solver packages are imported when a backend is created, so a model
+        solved with HiGHS does not need gurobipy installed. Both are optional
+        extras of the package, "gurobi" and "highs".
+"""
+
+import numpy as np
+
+from .params import constants
+
+
+class GurobiSolver:
+    """Gurobi backend (gurobipy)"""
+
+    name = "gurobi"
+
+    def __init__(self, model_name="infrasim", print_to_console=False):
+        import gurobipy as gp
+
+        self.model = gp.Model(model_name)
+        if print_to_console is False:
+            self.model.Params.LogToConsole = 0
+        self.variables = None
+
+    def add_variables(self, cost, lb, ub, name="arcflow"):
+        """Add flow variables and return them as an MVar"""
+        self.variables = self.model.addMVar(
+            len(cost), lb=lb, ub=ub, obj=cost, name=name
+        )
+        return self.variables
+
+    def add_constraints(self, A, sense, rhs, name=""):
+        """Add the constraint rows A @ x (sense) rhs"""
+        self.model.addMConstr(A, self.variables, sense, rhs, name=name)
+
+    def set_upper_bounds(self, idx, values):
+        """Change the upper bounds of variables idx in place"""
+        self.variables[idx].UB = values
+
+    def solve(self, print_to_console=False):
+        """Optimise, re-using the previous basis if there is one"""
+        if print_to_console:
+            self.model.Params.LogToConsole = 1
+            self.model.setParam("OutputFlag", 1)
+        else:
+            self.model.setParam("OutputFlag", 0)
+        self.model.optimize()
+
+    def solve_scenarios(self, upper_bounds):
+        """Solve scenarios of changed upper bounds in one optimize() call
+
+        upper_bounds holds an (idx, values) pair per scenario. Scenarios are
+        solved as one Gurobi multi-scenario model, which shares presolve and
+        search between them, with a zero MIP gap so each is solved to
+        optimality. Returns (solution, objective) per scenario, or None for
+        scenarios without a feasible solution.
+        """
+        from gurobipy import GRB
+
+        model = self.model
+        gap = model.Params.MIPGap
+        model.update()
+        cost = np.asarray(self.variables.Obj)
+        model.NumScenarios = len(upper_bounds)
+        for scenario, (idx, values) in enumerate(upper_bounds):
+            model.Params.ScenarioNumber = scenario
+            if len(idx) > 0:
+                self.variables[idx].ScenNUB = values
+            # scenario attributes go to the scenario current at update()
+            model.update()
+        model.Params.MIPGap = 0
+        try:
+            self.variables.Obj = penalty_costs(cost)
+            model.optimize()
+            solutions = []
+            for scenario in range(len(upper_bounds)):
+                model.Params.ScenarioNumber = scenario
+                if model.SolCount == 0 or model.ScenNObjVal >= GRB.INFINITY:
+                    solutions.append(None)
+                    continue
+                solution = np.asarray(self.variables.ScenNX)
+                # flows left within the tolerance of zero, unlike a vertex
+                solution[np.abs(solution) < model.Params.FeasibilityTol] = 0
+                solutions.append((solution, float(solution @ cost)))
+            return solutions
+        finally:
+            self.variables.Obj = cost
+            model.NumScenarios = 0
+            model.Params.ScenarioNumber = 0
+            model.Params.MIPGap = gap
+            model.update()
+
+    @property
+    def optimal(self):
+        return self.model.Status == 2
+
+    @property
+    def objective(self):
+        return self.model.ObjVal
+
+    def values(self):
+        """Return the solution as an array aligned with the variables"""
+        return self.variables.X
+
+    def write(self, filename):
+        self.model.write(filename)
+
+    def debug(self, filename):
+        """Compute an Irreducible Inconsistent Subsystem and write it to filename"""
+        self.model.computeIIS()
+        self.model.write(filename)
+
+
+class HighsSolver:
+    """HiGHS backend (highspy), which needs no license"""
+
+    name = "highs"
+
+    def __init__(self, model_name="infrasim", print_to_console=False):
+        import highspy
+
+        self._status = highspy.HighsModelStatus
+        self.model = highspy.Highs()
+        self.model.setOptionValue("output_flag", bool(print_to_console))
+        self.lb = None
+
+    def add_variables(self, cost, lb, ub, name="arcflow"):
+        """Add flow variables and return their column indices"""
+        n = len(cost)
+        self.lb = np.broadcast_to(np.asarray(lb, dtype="float64"), n).copy()
+        ub = np.broadcast_to(np.asarray(ub, dtype="float64"), n)
+        empty = np.array([], dtype=np.int32)
+        self.model.addCols(n, cost, self.lb, ub, 0, empty, empty, np.array([]))
+        return np.arange(n)
+
+    def add_constraints(self, A, sense, rhs, name=""):
+        """Add the constraint rows A @ x (sense) rhs"""
+        A = A.tocsr()
+        rhs = np.asarray(rhs, dtype="float64")
+        lower = np.full(A.shape[0], -np.inf) if sense == "<" else rhs
+        upper = np.full(A.shape[0], np.inf) if sense == ">" else rhs
+        if A.shape[0] == 0:
+            return
+        self.model.addRows(
+            A.shape[0],
+            lower,
+            upper,
+            A.nnz,
+            A.indptr[:-1].astype(np.int32),
+            A.indices.astype(np.int32),
+            A.data.astype("float64"),
+        )
+
+    def set_upper_bounds(self, idx, values):
+        """Change the upper bounds of variables idx in place"""
+        idx = np.asarray(idx, dtype=np.int32)
+        upper = np.broadcast_to(np.asarray(values, dtype="float64"), len(idx))
+        self.model.changeColsBounds(len(idx), idx, self.lb[idx], upper)
+
+    def solve(self, print_to_console=False):
+        """Optimise, re-using the previous basis if there is one"""
+        self.model.setOptionValue("output_flag", bool(print_to_console))
+        self.model.run()
+
+    @property
+    def optimal(self):
+        return self.model.getModelStatus() == self._status.kOptimal
+
+    @property
+    def objective(self):
+        return self.model.getInfo().objective_function_value
+
+    def values(self):
+        """Return the solution as an array aligned with the variables"""
+        return np.asarray(self.model.getSolution().col_value)
+
+    def write(self, filename):
+        self.model.writeModel(filename)
+
+    def debug(self, filename):
+        raise ValueError("IIS is only available with solver='gurobi'")
+
+
+def penalty_costs(cost):
+    """Return cost with the super arc costs scaled down to a tight penalty
+
+    Super arcs cost super_source_maximum on top of their length. Within the
+    solver tolerances that swamps the lengths that decide which arcs are
+    cut off, so the penalty is set just above the summed cost of every other
+    arc instead, which still ranks any unmet demand above every route.
+    """
+    penalty = np.floor(np.maximum(cost, 0) / constants["super_source_maximum"])
+    length = cost - penalty * constants["super_source_maximum"]
+    return length + penalty * (np.abs(length).sum() + 1)
+
+
+backends = {
+    "gurobi": GurobiSolver,
+    "highs": HighsSolver,
+}
+
+
+def get_solver(solver, **kwargs):
+    """Return a new solver backend by name"""
+    if solver not in backends:
+        raise ValueError(f"Unrecognised solver: {solver}")
+    return backends[solver](**kwargs)
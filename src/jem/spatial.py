@@ -1,25 +1,68 @@
 import geopandas as gpd
-from shapely.geometry import Point
-import snkit
+import numpy as np
+import pandas as pd
+import shapely
+from scipy import sparse
+from scipy.sparse import csgraph
 import networkx as nx
 
 from .meta import metainfo
 
 
-def add_graph_topology(nodes, edges, id_attribute="ID", save=False, label=False):
-    """Add i,j,k notation to edges"""
-    i_field = metainfo["i_field"]
-    j_field = metainfo["j_field"]
-    # find nearest node to the START coordinates of the line -- and return the 'ID' attribute
-    edges[i_field] = edges.geometry.apply(
-        lambda geom: snkit.network.nearest(Point(geom.coords[0]), nodes)[id_attribute]
+def snap_to_nodes(nodes, edges, id_attribute="ID"):
+    """Return the nodes nearest the start and end of every edge
+
+    All endpoints are snapped in one STRtree.query_nearest over the node
+    geometry. Returns a DataFrame aligned with edges, with the from_id and
+    to_id of the nearest nodes and their snapping distances, from_snap and
+    to_snap, so that bad snaps can be flagged.
+    """
+    lines = edges.geometry.to_numpy()
+    points = np.concatenate([shapely.get_point(lines, 0), shapely.get_point(lines, -1)])
+    tree = shapely.STRtree(nodes.geometry.to_numpy())
+    (point, node), distance = tree.query_nearest(
+        points, return_distance=True, all_matches=False
     )
-    # find nearest node to the END coordinates of the line -- and return the 'ID' attribute
-    edges[j_field] = edges.geometry.apply(
-        lambda geom: snkit.network.nearest(Point(geom.coords[-1]), nodes)[id_attribute]
+
+    # points of empty lines have no nearest node
+    nearest = np.full(len(points), None, dtype=object)
+    nearest[point] = nodes[id_attribute].to_numpy()[node]
+    snap = np.full(len(points), np.nan)
+    snap[point] = distance
+
+    n = len(lines)
+    return pd.DataFrame(
+        {
+            metainfo["i_field"]: nearest[:n],
+            metainfo["j_field"]: nearest[n:],
+            "from_snap": snap[:n],
+            "to_snap": snap[n:],
+        },
+        index=edges.index,
     )
+
+
+def add_graph_topology(
+    nodes, edges, id_attribute="ID", save=False, label=False, snap_distance=False
+):
+    """Add i,j,k notation to edges
+
+    snap_distance keeps the from_snap and to_snap distances of the edge
+    ends to their nodes, see snap_to_nodes().
+    """
+    i_field = metainfo["i_field"]
+    j_field = metainfo["j_field"]
+    # find nearest nodes to the START and END coordinates of the lines
+    snapped = snap_to_nodes(nodes, edges, id_attribute=id_attribute)
+    edges[i_field] = snapped[i_field]
+    edges[j_field] = snapped[j_field]
     # order columns
-    edges = edges[metainfo["edges_header"] + ["geometry"]]
+    columns = metainfo["edges_header"] + ["geometry"]
+    if snap_distance:
+        edges["from_snap"] = snapped["from_snap"]
+        edges["to_snap"] = snapped["to_snap"]
+        columns += ["from_snap", "to_snap"]
+    edges = edges[columns]
     # label
     if label:
         edges["label"] = "(" + edges[i_field] + "," + edges[j_field] + ")"
@@ -53,35 +96,40 @@ def to_nx(nodes, edges):
     # add nodes
     G.add_nodes_from(nodes.id.to_list())
 
-    # create list of weighted edges
-    edges_as_list = [
-        (edges.loc[i].from_id, edges.loc[i].to_id, edges.loc[i].length)
-        for i in edges.index
-    ]
-
-    # add edges to graph
-    G.add_weighted_edges_from(edges_as_list)
+    # add weighted edges to graph, straight from the columns
+    G.add_weighted_edges_from(
+        zip(edges.from_id.to_list(), edges.to_id.to_list(), edges.length.to_list())
+    )
     return G
 
 
-def get_isolated_graphs(nodes, edges):
-    """Find subgraphs within network and tag edges by graph"""
-    # define as nx
-    G = to_nx(nodes, edges)
-
-    # get connected_components
-    connected_parts = sorted(nx.connected_components(G), key=len, reverse=True)
-
-    # tag each individual network
-    count = 1
-    edges["nx_part"] = 0
+def label_components(nodes, edges):
+    """Return connected component labels of nodes and edges
+
+    Components are numbered from 1, largest first (by number of nodes) as
+    in get_isolated_graphs(), in one pass of scipy's connected_components
+    over integer node codes. Returns (node labels, edge labels) as arrays
+    aligned with nodes and edges.
+    """
+    # node codes, in the order networkx adds the nodes
+    i = edges.from_id.to_numpy(dtype=object)
+    j = edges.to_id.to_numpy(dtype=object)
+    ends = np.column_stack([i, j]).ravel()
+    index = pd.Index(pd.unique(np.concatenate([nodes.id.to_numpy(dtype=object), ends])))
+    u, v = index.get_indexer(i), index.get_indexer(j)
+
+    # label components, then number them by decreasing size
+    n = len(index)
+    graph = sparse.coo_matrix((np.ones(len(u)), (u, v)), shape=(n, n))
+    _, labels = csgraph.connected_components(graph, directed=False)
+    order = np.argsort(-np.bincount(labels), kind="stable")
+    part = np.empty(len(order), dtype="int64")
+    part[order] = np.arange(1, len(order) + 1)
+    node_part = part[labels]
+    return node_part[index.get_indexer(nodes.id)], node_part[u]
 
-    for part in connected_parts:
-        edges.loc[
-            (edges.from_id.isin(list(part))) | (edges.to_id.isin(list(part))), "nx_part"
-        ] = count
-
-        # adjust counter
-        count = count + 1
 
+def get_isolated_graphs(nodes, edges):
+    """Find subgraphs within network and tag nodes and edges by graph"""
+    nodes["nx_part"], edges["nx_part"] = label_components(nodes, edges)
     return nodes, edges
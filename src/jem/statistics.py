@@ -1,8 +1,25 @@
+from functools import cached_property
+
+import numpy as np
 import pandas as pd
 
 from .utils import get_source_nodes, get_sink_nodes
 
+
+def rows_of(groups, nodes):
+    """Return the sorted rows of nodes, given groups of rows keyed by node"""
+    rows = [groups[node] for node in dict.fromkeys(nodes) if node in groups]
+    if not rows:
+        return np.array([], dtype="int64")
+    return np.sort(np.concatenate(rows))
+
+
 class statistics:
+    """Statistics of a solved jem model
+
+    Lookups go through indexes built on first use, and results are cached,
+    so repeated calls on the same solution cost O(k) in the nodes asked for.
+    """
 
     def __init__(self, model_run):
         self.nodes = model_run.nodes
@@ -10,71 +27,117 @@ class statistics:
         self.flows = model_run.flows
         self.edge_flows = model_run.results_arcflows
 
-    def supply_demand_balance(self):
-        """Return dataframe of supply and demand"""
-        supply_nodes = get_source_nodes(self)
-        supply = self.flows[self.flows.node.isin(supply_nodes)].flow.sum()
+    # ---
+    # indexes, built once per solution
+
+    @cached_property
+    def node_rows(self):
+        """Rows of nodes, keyed by node id"""
+        return self.nodes.groupby("id", observed=True, sort=False).indices
+
+    @cached_property
+    def flow_rows(self):
+        """Rows of flows, keyed by node id"""
+        return self.flows.groupby("node", observed=True, sort=False).indices
+
+    @cached_property
+    def node_columns(self):
+        """Node ids and population, as arrays"""
+        return self.nodes.id.array, self.nodes.population.array
+
+    @cached_property
+    def flow_columns(self):
+        """Flow nodes and flows, as arrays"""
+        return self.flows.node.array, self.flows.flow.array
 
+    @cached_property
+    def nodal_flows(self):
+        """Inflow and outflow of every node and timestep"""
+        edge_flows = self.edge_flows
+        inflow = edge_flows.groupby(["to_id", "timestep"], observed=True).flow.sum()
+        outflow = edge_flows.groupby(["from_id", "timestep"], observed=True).flow.sum()
+        inflow = inflow.rename_axis(["node", "timestep"])
+        outflow = outflow.rename_axis(["node", "timestep"])
+        nodal_flows = pd.concat({"inflow": inflow, "outflow": outflow}, axis=1)
+        return nodal_flows.fillna(0).sort_index().reset_index()
+
+    @cached_property
+    def nodal_flow_rows(self):
+        """Rows of nodal_flows, keyed by node id"""
+        return self.nodal_flows.groupby("node", observed=True, sort=False).indices
+
+    @cached_property
+    def _super_source_flows(self):
+        return (
+            self.edge_flows[
+                (self.edge_flows.from_id == "super_source") & (self.edge_flows.flow > 0)
+            ]
+            .copy()
+            .reset_index(drop=True)
+        )
+
+    @cached_property
+    def _nodes_with_shortfall(self):
+        idx = self.super_source_flows()
+        idx["node"] = idx["to_id"]
+        idx["shortfall"] = idx["flow"]
+        return idx[["node", "shortfall", "timestep"]].reset_index(drop=True)
+
+    @cached_property
+    def _population_affected(self):
+        n = self._nodes_with_shortfall.node.to_list()
+        return self.get_population_at_nodes(nodes=n)
+
+    @cached_property
+    def _supply_demand_balance(self):
+        supply_nodes = get_source_nodes(self)
         demand_nodes = get_sink_nodes(self)
-        demand = self.flows[self.flows.node.isin(demand_nodes)].flow.sum()
+        supply = self.flows.flow.iloc[rows_of(self.flow_rows, supply_nodes)].sum()
+        demand = self.flows.flow.iloc[rows_of(self.flow_rows, demand_nodes)].sum()
         return pd.DataFrame({"supply": [supply], "demand": [demand]})
 
+    # ---
+    # statistics
+
+    def supply_demand_balance(self):
+        """Return dataframe of supply and demand"""
+        return self._supply_demand_balance.copy()
+
     def total_demand_shortfall(self):
         """Return total unmet load"""
-        if self.edge_flows.loc[self.edge_flows.from_id == "super_source"] is True:
-            return 0
-        else:
-            return self.edge_flows.loc[
-                self.edge_flows.from_id == "super_source"
-            ].flow.sum()
+        return self._super_source_flows.flow.sum()
 
     def nodes_with_shortfall(self):
         """Return dataframe of nodes with shortage"""
-        idx = self.super_source_flows()
-        idx["node"] = idx["to_id"]
-        idx["shortfall"] = idx["flow"]
-        return idx[["node", "shortfall", "timestep"]].reset_index(drop=True)
+        return self._nodes_with_shortfall.copy()
 
     def customers_affected(self):
         """Return total population affected"""
-        n = self.nodes_with_shortfall().node.to_list()
-        p = self.get_population_at_nodes(nodes=n)
-        return p.population.sum().astype("int")
+        return self._population_affected.population.sum().astype("int")
 
     def customers_affected_total(self):
         """Return population affected"""
-        n = self.nodes_with_shortfall().node.to_list()
-        p = self.get_population_at_nodes(nodes=n)
+        p = self._population_affected.copy()
         p.population = p.population.astype("int")
-        return p.reset_index(drop=True)
+        return p
 
     def super_source_flows(self):
         """Return flows from super_source"""
-        return (
-            self.edge_flows[
-                (self.edge_flows.from_id == "super_source") & (self.edge_flows.flow > 0)
-            ]
-            .copy()
-            .reset_index(drop=True)
-        )
+        return self._super_source_flows.copy()
 
     def get_population_at_nodes(self, nodes, col_id=None):
         """Return population for list of nodes"""
-        if not col_id:
-            return self.nodes[self.nodes.id.isin(nodes)][
-                ["id", "population"]
-            ].reset_index(drop=True)
-        else:
-            population = self.nodes[self.nodes.id.isin(nodes)][["id", "population"]]
-            population[col_id] = population["id"]
-        return population[[col_id, "population"]].reset_index(drop=True)
+        rows = rows_of(self.node_rows, nodes)
+        ids, population = self.node_columns
+        return pd.DataFrame({col_id or "id": ids[rows], "population": population[rows]})
 
     def get_demand_at_nodes(self, nodes, col_id=None):
         """Return demand for list of nodes"""
-        demand = self.flows[self.flows.node.isin(nodes)][["node", "flow"]]
-        demand["demand"] = demand["flow"]
-        if not col_id:
-            return demand[["node", "demand"]].reset_index(drop=True)
-        else:
-            demand[col_id] = demand["node"]
-            return demand[[col_id, "demand"]].reset_index(drop=True)
+        rows = rows_of(self.flow_rows, nodes)
+        ids, demand = self.flow_columns
+        return pd.DataFrame({col_id or "node": ids[rows], "demand": demand[rows]})
+
+    def get_flows_at_nodes(self, nodes):
+        """Return inflow and outflow of list of nodes in every timestep"""
+        rows = rows_of(self.nodal_flow_rows, nodes)
+        return self.nodal_flows.iloc[rows].reset_index(drop=True)
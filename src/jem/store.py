@@ -0,0 +1,113 @@
+"""
+    store.py
+        Append-only store of sweep results
+
+        Impact records of a sweep (see sweeps.sweep) are appended to a SQLite
+        file, one transaction per batch of records. Scenario keys are the
+        primary key, so a record that is already stored is skipped, and a
+        sweep that is stopped and run again resumes from the scenarios not
+        yet stored.
+"""
+
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+# columns of an impact record's "impacts"
+impact_columns = ["node", "asset_type", "population", "demand", "shortfall", "timestep"]
+
+# the key column has no declared type, so int and str keys read back unchanged
+schema = [
+    "CREATE TABLE IF NOT EXISTS scenarios "
+    "(key PRIMARY KEY, status TEXT, objective REAL)",
+    "CREATE TABLE IF NOT EXISTS impacts "
+    "(key, node TEXT, asset_type TEXT, population REAL, demand REAL, "
+    "shortfall REAL, timestep)",
+]
+
+
+def sql_key(key):
+    """Return a scenario key as a type sqlite3 binds, e.g. int for np.int64"""
+    if isinstance(key, np.integer):
+        return int(key)
+    if isinstance(key, np.str_):
+        return str(key)
+    return key
+
+
+class ResultStore:
+    """Impact records of a sweep, keyed by scenario
+
+    Use as a context manager, or call close(), to close the file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        with self.connection:
+            for statement in schema:
+                self.connection.execute(statement)
+            # stores written before objectives were kept
+            columns = self.connection.execute("PRAGMA table_info(scenarios)")
+            if "objective" not in [row[1] for row in columns]:
+                self.connection.execute("ALTER TABLE scenarios ADD objective REAL")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM scenarios").fetchone()[0]
+
+    def completed(self):
+        """Return the set of stored scenario keys"""
+        return {key for (key,) in self.connection.execute("SELECT key FROM scenarios")}
+
+    def append(self, records):
+        """Store records in one transaction, skipping stored keys
+
+        Returns the number of records stored.
+        """
+        stored = 0
+        with self.connection:
+            for record in records:
+                key = sql_key(record["key"])
+                cursor = self.connection.execute(
+                    "INSERT OR IGNORE INTO scenarios VALUES (?, ?, ?)",
+                    (key, record["status"], record.get("objective", None)),
+                )
+                if cursor.rowcount == 0:
+                    continue
+                stored += 1
+                impacts = record.get("impacts", None)
+                if impacts is None or impacts.empty:
+                    continue
+                rows = zip(*[impacts[column].tolist() for column in impact_columns])
+                self.connection.executemany(
+                    "INSERT INTO impacts VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    ((key, *row) for row in rows),
+                )
+        return stored
+
+    def read(self):
+        """Return every stored record as a DataFrame, in the order stored
+
+        There is one row per scenario and node short of supply, and one row
+        with empty impact columns for a scenario without shortfall.
+        """
+        scenarios = pd.read_sql_query(
+            "SELECT key, status, objective FROM scenarios ORDER BY rowid",
+            self.connection,
+        )
+        impacts = pd.read_sql_query(
+            "SELECT * FROM impacts ORDER BY rowid", self.connection
+        )
+        return scenarios.merge(impacts, on="key", how="left", sort=False)
+
+    def close(self):
+        self.connection.close()
@@ -0,0 +1,303 @@
+"""
+    sweeps.py
+        Failure scenarios swept by a pool of workers
+
+        Every worker attaches to the published network (shared.publish) and
+        fails arcs in place on one model (scenarios.ScenarioRunner).
+"""
+
+import itertools
+from concurrent.futures import FIRST_COMPLETED, wait
+
+import numpy as np
+import pandas as pd
+
+from . import ids
+from . import shared
+from . import utils
+from .cache import ScenarioCache, fingerprint
+from .meta import metainfo
+from .scenarios import ScenarioRunner
+
+# state of each worker process, set by init_worker()
+worker = {}
+
+# chunks in flight per worker
+queue_depth = 2
+
+
+class Impacts:
+    """Population and demand of the nodes short of supply in a scenario"""
+
+    def __init__(self, network):
+        nodes = network.nodes.drop_duplicates(subset="id")
+        self.node_index = pd.Index(nodes.id)
+        self.asset_type = nodes.asset_type.to_numpy()
+        self.population = np.zeros(len(nodes))
+        if "population" in nodes:
+            self.population = nodes.population.fillna(0).to_numpy(dtype="float64")
+        flows = network.flows
+        self.flow_index = pd.MultiIndex.from_arrays(
+            [flows.node.astype(str), flows.timestep]
+        )
+        self.demand = flows.flow.to_numpy()
+
+    def __call__(self, shortfall):
+        """Return shortfall with the asset type, population and demand of nodes"""
+        rows = ids.positions(self.node_index, shortfall.node)
+        flow_rows = self.flow_index.get_indexer(
+            pd.MultiIndex.from_arrays([shortfall.node.astype(str), shortfall.timestep])
+        )
+        return pd.DataFrame(
+            {
+                "node": shortfall.node.astype(str).to_numpy(),
+                "asset_type": np.where(rows < 0, None, self.asset_type[rows]),
+                "population": np.where(rows < 0, 0, self.population[rows]),
+                "demand": np.where(flow_rows < 0, 0, self.demand[flow_rows]),
+                "shortfall": shortfall.shortfall.to_numpy(),
+                "timestep": shortfall.timestep.to_numpy(),
+            }
+        )
+
+
+def options(network, screen=True, connectivity=False, **kwargs):
+    """Return the model, runner and build options a worker needs"""
+    model = {
+        "solver": network.solver.name,
+        "nodes_to_attack": network.nodes_to_attack,
+        "edges_to_attack": network.edges_to_attack,
+        "print_to_console": False,
+    }
+    build = dict(kwargs)
+    if getattr(network, "build_method", None) is not None:
+        # build the workers as network was built
+        build = {
+            "method": network.build_method,
+            "flow_bounds": network.flow_bounds,
+            "radial": network.radial,
+            "slack": network.slack,
+            "junctions": network.junctions,
+            "unique_timesteps": network.unique_timesteps,
+            **kwargs,
+        }
+    runner = {"screen": screen, "connectivity": connectivity}
+    return model, runner, build
+
+
+def init_worker(network, model, runner, build, arcflows):
+    """Attach to the published network and build its model once"""
+    if isinstance(network, shared.SharedNetwork):
+        network = shared.attach(network, **model)
+    worker["runner"] = ScenarioRunner(network, **runner, **build)
+    worker["impacts"] = Impacts(network)
+    worker["arcflows"] = arcflows
+
+
+def solve_chunk(chunk):
+    """Return the impact records of a chunk of (key, scenario) pairs"""
+    runner = worker["runner"]
+    records = []
+    for key, scenario in chunk:
+        shortfall = runner.solve(
+            nodes=scenario.get("nodes", None), edges=scenario.get("edges", None)
+        )
+        record = {"key": key, "status": "optimal", "impacts": None}
+        record["objective"] = runner.objective
+        if shortfall is None:
+            record["status"] = "infeasible"
+        else:
+            record["impacts"] = worker["impacts"](shortfall)
+        if worker["arcflows"]:
+            record["arcflows"] = None
+            if shortfall is not None:
+                record["arcflows"] = runner.network.results_arcflows
+        records.append(record)
+    return records
+
+
+def items(scenarios):
+    """Return (key, scenario) pairs, keyed by position unless a mapping"""
+    if hasattr(scenarios, "items"):
+        return iter(scenarios.items())
+    return enumerate(scenarios)
+
+
+def chunks(pairs, chunksize):
+    while True:
+        chunk = list(itertools.islice(pairs, chunksize))
+        if not chunk:
+            return
+        yield chunk
+
+
+def outcome(record):
+    """Return the cache.ScenarioCache outcome of an impact record"""
+    shortfall = []
+    if record["impacts"] is not None:
+        impacts = record["impacts"]
+        columns = [impacts[column].tolist() for column in ["node", "timestep"]]
+        shortfall = [list(row) for row in zip(*columns, impacts.shortfall.tolist())]
+    return {
+        "status": record["status"],
+        "objective": record["objective"],
+        "shortfall": shortfall,
+    }
+
+
+def cached_record(key, outcome, impacts):
+    """Return the impact record of a cache.ScenarioCache outcome"""
+    record = {"key": key, "status": outcome["status"], "impacts": None}
+    record["objective"] = outcome["objective"]
+    if outcome["status"] == "optimal":
+        shortfall = pd.DataFrame(
+            outcome["shortfall"], columns=["node", "timestep", "shortfall"]
+        )
+        # an empty outcome has no values to infer the dtypes of solved ones
+        shortfall = shortfall.astype(
+            {"timestep": impacts.flow_index.levels[1].dtype, "shortfall": "float64"}
+        )
+        record["impacts"] = impacts(shortfall)
+    return record
+
+
+class CacheLookup:
+    """(key, scenario) pairs not found in a cache.ScenarioCache
+
+    Iterating yields the pairs to solve and keeps their digests, to store
+    their outcomes once solved. Pairs found in the cache become impact
+    records, taken with pop_hits(). With arcflows=True, pairs found with a
+    shortfall are solved again for their arc flows, and the other records
+    found hold None arcflows.
+    """
+
+    def __init__(self, pairs, scenario_cache, impacts, arcflows=False):
+        self.pairs = pairs
+        self.cache = scenario_cache
+        self.impacts = impacts
+        self.arcflows = arcflows
+        self.digests = {}
+        self.hits = []
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        for key, scenario in self.pairs:
+            nodes, edges = scenario.get("nodes", None), scenario.get("edges", None)
+            digest = self.cache.key(nodes, edges)
+            found = self.cache.get(digest)
+            if found is None or (self.arcflows and found["shortfall"]):
+                self.digests[key] = digest
+                return key, scenario
+            record = cached_record(key, found, self.impacts)
+            if self.arcflows:
+                record["arcflows"] = None
+            self.hits.append(record)
+        raise StopIteration
+
+    def pop_hits(self):
+        hits, self.hits = self.hits, []
+        return hits
+
+
+def sweep(
+    network,
+    scenarios,
+    workers=None,
+    chunksize=8,
+    arcflows=False,
+    store=None,
+    cache=False,
+    cache_size=None,
+    **kwargs,
+):
+    """Yield one impact record per scenario, in the order they finish
+
+    scenarios are dicts with optional "nodes" and "edges" lists of failed
+    ids, given as an iterable (keyed by position) or a mapping of keys to
+    scenarios. Each record is a dict of the scenario "key", its "status"
+    ("optimal" or "infeasible"), its "objective" (None if the LP was not
+    solved) and its "impacts", the nodes short of supply with their asset
+    type, population, demand and shortfall per timestep. With arcflows=True
+    records also hold the scenario results_arcflows, or None when no arc
+    flows were solved (see ScenarioRunner connectivity).
+
+    With a store.ResultStore, scenarios already stored are skipped and the
+    records of each chunk are appended to the store as it finishes.
+
+    With cache=True (metainfo["infrasim_cache"]) or a cache directory, the
+    outcome of each scenario is looked up in a cache.ScenarioCache, capped
+    at cache_size bytes, before it is sent out, and solved scenarios are
+    added to it. With arcflows=True only the scenarios found with a
+    shortfall are solved again, for their arc flows, and the other records
+    found hold None arcflows.
+
+    workers defaults to utils.default_workers() and workers=1 solves on
+    network itself. kwargs are ScenarioRunner screen and connectivity and
+    build options, which default to those network was built with.
+    """
+    if workers is None:
+        workers = utils.default_workers()
+    model, runner, build = options(network, **kwargs)
+    pairs = items(scenarios)
+    if store is not None:
+        completed = store.completed()
+        pairs = (pair for pair in pairs if pair[0] not in completed)
+
+    scenario_cache = None
+    if cache:
+        cache_dir = metainfo["infrasim_cache"] if cache is True else cache
+        scenario_cache = ScenarioCache(
+            cache_dir,
+            fingerprint(network, solver=model["solver"], **build),
+            max_bytes=cache_size,
+        )
+        pairs = CacheLookup(pairs, scenario_cache, Impacts(network), arcflows)
+
+    def finished(records):
+        if scenario_cache is not None:
+            scenario_cache.put(
+                (pairs.digests.pop(record["key"]), outcome(record))
+                for record in records
+                if record["key"] in pairs.digests
+            )
+        if store is not None:
+            store.append(records)
+        return records
+
+    def cached():
+        if scenario_cache is None:
+            return []
+        return finished(pairs.pop_hits())
+
+    pending = chunks(pairs, chunksize)
+    try:
+        if workers == 1:
+            init_worker(network, model, runner, build, arcflows)
+            for chunk in pending:
+                yield from cached()
+                yield from finished(solve_chunk(chunk))
+            yield from cached()
+            return
+
+        # chunks of a few scenarios balance fast and slow ones across workers
+        with shared.publish(network) as published, utils.process_pool(
+            workers, init_worker, (published, model, runner, build, arcflows)
+        ) as pool:
+            running = {
+                pool.submit(solve_chunk, chunk)
+                for chunk in itertools.islice(pending, workers * queue_depth)
+            }
+            yield from cached()
+            while running:
+                done, running = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    chunk = next(pending, None)
+                    if chunk is not None:
+                        running.add(pool.submit(solve_chunk, chunk))
+                    yield from cached()
+                    yield from finished(future.result())
+            yield from cached()
+    finally:
+        if scenario_cache is not None:
+            scenario_cache.close()
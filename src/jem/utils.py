@@ -5,10 +5,14 @@
     @amanmajid
 """
 
+import multiprocessing
 import os
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
 import pandas as pd
 
+from . import ids
 from .meta import metainfo
 from .params import constants
 
@@ -102,11 +106,11 @@ def tag_super_source_flows(jem):
     return jem
 
 
-def merge_edges_with_flows(jem):
+def merge_edges_with_flows(jem, geometry=False):
     """Merge edge data with results of optimal flows"""
     results = jem.results_arcflows.copy()
-    edges = jem.edges.copy()
-    if "timestep" in list(results.columns) and list(edges.columns):
+    edges = jem.geometry("edges") if geometry else jem.edges.copy()
+    if "timestep" in list(results.columns) and "timestep" in list(edges.columns):
         edges = edges.drop(["timestep"], axis=1)
     # merge
     return edges.merge(results, on=["from_id", "to_id"])
@@ -114,45 +118,61 @@ def merge_edges_with_flows(jem):
 
 def flows_to_shapefile(jem, filename, driver="ESRI Shapefile", timestep=1):
     """Export optimal flow results to shapefile"""
-    results = merge_edges_with_flows(jem)
+    results = merge_edges_with_flows(jem, geometry=True)
     results.to_file(driver="ESRI Shapefile", filename=filename)
 
 
 def get_nodal_edges(jem, node):
-    return jem.edges.loc[(jem.edges.from_id == node) | (jem.edges.to_id == node)]
+    return jem.edges.iloc[jem.edge_positions.rows(node)]
 
 
 def get_nodal_inflow(jem, node):
     """Return inflows to a given node"""
-    return jem.results_arcflows.loc[jem.results_arcflows.to_id == node]
+    rows = jem.flow_positions.rows(node, outflow=False)
+    return jem.results_arcflows.iloc[rows]
 
 
 def get_nodal_outflow(jem, node):
     """Return outflows from a given node"""
-    return jem.results_arcflows.loc[jem.results_arcflows.from_id == node]
+    rows = jem.flow_positions.rows(node, inflow=False)
+    return jem.results_arcflows.iloc[rows]
 
 
 def get_flow_at_node(jem, node):
     """Return inflows and ouflows at a given node"""
-    return jem.results_arcflows.loc[
-        (jem.results_arcflows.from_id == node) | (jem.results_arcflows.to_id == node)
-    ]
+    return jem.results_arcflows.iloc[jem.flow_positions.rows(node)]
+
+
+def mass_balance(inflow, outflow):
+    """Return "balanced", "excess" or "shortage" of outflow over inflow"""
+    delta = np.asarray(outflow - inflow)
+    return np.select([delta == 0, delta > 0], ["balanced", "excess"], "shortage")
 
 
 def get_nodal_balance(jem, node):
     """Return inflow and outflow at a given node"""
     inflow = get_nodal_inflow(jem, node).flow.sum()
     outflow = get_nodal_outflow(jem, node).flow.sum()
-    delta = outflow - inflow
-    if delta == 0:
-        balance = "balanced"
-    elif delta > 0:
-        balance = "excess"
-    elif delta < 0:
-        balance = "shortage"
+    balance = str(mass_balance(inflow, outflow))
     return {"inflow": inflow, "outflow": outflow, "mass_balance": balance}
 
 
+def get_nodal_balances(jem):
+    """Return inflow, outflow and mass balance of every node and timestep"""
+    index = jem.flow_positions
+    inflow, outflow = index.sums(jem.results_arcflows.flow.to_numpy())
+    codes = np.repeat(np.arange(index.n, dtype=np.int32), index.n_timesteps)
+    return pd.DataFrame(
+        {
+            "node": jem.node_ids.decode(codes),
+            "timestep": np.tile(index.timesteps, index.n),
+            "inflow": inflow.ravel(),
+            "outflow": outflow.ravel(),
+            "mass_balance": mass_balance(inflow, outflow).ravel(),
+        }
+    )
+
+
 def estimate_edge_capacity(jem, cap_name="cap_estimate", rounding=False):
     """Estimate edge capacity (W) from flow data"""
     flow_results = merge_edges_with_flows(jem)
@@ -226,20 +246,15 @@ def add_time_to_edges(flows, edges):
 
 
 def arc_indicies_as_dict(self, var_name):
-    """Function to convert edge indices dataframe to dict"""
-    asDict = (
-        self.edge_indices[self.indices + [var_name]]
-        .set_index(keys=self.indices)[var_name]
-        .to_dict()
-    )
-    return asDict
+    """Function to convert edge indices to dict, keyed by (i, j, t) codes"""
+    keys = ids.keys(self.edge_indices, self.indices)
+    return dict(zip(keys, self.edge_indices[var_name].tolist()))
 
 
 def flows_as_dict(flows):
-    """Convert flows from csv to dict"""
-    flows_dict = flows[["node", "timestep", "flow"]]
-    flows_dict = flows_dict.set_index(keys=["node", "timestep"]).to_dict()["flow"]
-    return flows_dict
+    """Convert flows from csv to dict, keyed by (node, t) codes"""
+    keys = ids.keys(flows, ["node", "timestep"])
+    return dict(zip(keys, flows.flow.tolist()))
 
 
 def add_super_source(nodes, edges):
@@ -351,7 +366,50 @@ def get_node_names(
     return idx_nodes
 
 
+def get_failed_arcs(arcs, nodes_to_attack=None, edges_to_attack=None):
+    """Return mask of arcs to or from failed nodes and of failed edges"""
+    failed = np.zeros(len(arcs), dtype=bool)
+    if nodes_to_attack:
+        failed |= arcs.from_id.isin(nodes_to_attack).to_numpy()
+        failed |= arcs.to_id.isin(nodes_to_attack).to_numpy()
+    if edges_to_attack:
+        failed |= arcs.id.isin(edges_to_attack).to_numpy()
+    return failed
+
+
 def get_flow_at_nodes(flows, list_of_nodes):
     """Get flows of specific nodes"""
     idx_flows = flows.loc[flows.node.isin(list_of_nodes)].reset_index(drop=True)
     return idx_flows
+
+
+# ---
+# Processes
+# ---
+
+
+def default_workers():
+    """Return the cores allotted to this process, for pools of workers
+
+    SLURM_CPUS_PER_TASK on a SLURM job, else the cores this process may run
+    on, which a scheduler or taskset can restrict below os.cpu_count().
+    """
+    if os.environ.get("SLURM_CPUS_PER_TASK"):
+        return int(os.environ["SLURM_CPUS_PER_TASK"])
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def process_pool(workers, initializer, initargs):
+    """Return a pool of workers processes, each set up by initializer
+
+    Workers are spawned, so each starts a fresh solver environment and,
+    with Gurobi, takes its own license token or seat.
+    """
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=initializer,
+        initargs=initargs,
+    )
@@ -0,0 +1,8 @@
+import pytest
+
+from .networks import synthetic_network
+
+
+@pytest.fixture
+def network():
+    return synthetic_network()
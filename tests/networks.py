@@ -0,0 +1,108 @@
+"""
+    networks.py
+        Small synthetic networks and solution helpers for the tests
+"""
+
+import numpy as np
+import pandas as pd
+
+from jem.meta import metainfo
+
+
+def synthetic_network(
+    n_feeders=3, feeder_depth=2, n_sources=2, n_core=4, n_timesteps=3, seed=0
+):
+    """Return (nodes, edges, flows) of a small bi-directional network
+
+    A meshed core of junctions is fed by sources, with radial feeders of
+    poles and sinks, a junction strung between consecutive poles and a dead
+    end of junctions. The first and last timesteps repeat each other.
+    """
+    rng = np.random.default_rng(seed)
+    node_ids = []
+    asset_types = []
+    links = []
+
+    def add_node(asset_type):
+        node_ids.append(f"node_{len(node_ids) + 1}")
+        asset_types.append(asset_type)
+        return node_ids[-1]
+
+    # meshed core: a ring of junctions with a chord
+    core = [add_node("junction") for _ in range(n_core)]
+    links += [(core[k], core[(k + 1) % n_core]) for k in range(n_core)]
+    links.append((core[0], core[n_core // 2]))
+
+    for k in range(n_sources):
+        links.append((add_node("source"), core[k % n_core]))
+
+    # radial feeders, with a span junction before every pole
+    for f in range(n_feeders):
+        parent = core[(f + 1) % n_core]
+        for _ in range(feeder_depth):
+            span = add_node("junction")
+            pole = add_node("junction")
+            links += [(parent, span), (span, pole), (pole, add_node("sink"))]
+            parent = pole
+
+    # dead end of junctions
+    stub = add_node("junction")
+    links += [(core[-1], stub), (stub, add_node("junction"))]
+
+    nodes = pd.DataFrame({"id": node_ids, "asset_type": asset_types})
+    nodes["subtype"] = nodes.asset_type
+    nodes["population"] = np.where(
+        nodes.asset_type == "sink", rng.integers(10, 500, len(nodes)), 0
+    )
+
+    links = pd.DataFrame(links, columns=["from_id", "to_id"])
+    reverse = links.rename(columns={"from_id": "to_id", "to_id": "from_id"})
+    edges = pd.concat([links, reverse], ignore_index=True)
+    edges.insert(0, "id", [f"edge_{k + 1}" for k in range(len(edges))])
+    edges["length"] = rng.uniform(0.1, 5.0, len(edges)).round(3)
+    edges["min"] = 0
+    edges["max"] = 100
+
+    sinks = nodes.loc[nodes.asset_type == "sink", "id"]
+    sources = nodes.loc[nodes.asset_type == "source", "id"]
+    profile = 1 + 0.5 * np.sin(np.linspace(0, 2 * np.pi, n_timesteps))
+    demand = rng.uniform(0.1, 2.0, len(sinks))
+    flows = pd.DataFrame(np.outer(profile, demand).round(3), columns=sinks.to_list())
+    supply = 1.2 * flows.sum(axis=1).max() / len(sources)
+    for s in sources:
+        flows[s] = supply
+    return nodes, edges, flows
+
+
+def objective(network):
+    """Return the cost of the arc flows of a solved network"""
+    arcs = network.edge_indices
+    cost = arcs.column(metainfo["cost_column"], arcs.unique(network.indices))
+    cost = cost.astype("float64")
+    return float(network.results_arcflows.flow.to_numpy() @ cost)
+
+
+def arcflows(network):
+    """Return the arc flows of a solved network, ordered by arc"""
+    results = network.results_arcflows
+    keys = [results[column].astype(str) for column in ["from_id", "to_id"]]
+    order = np.lexsort([results.timestep.to_numpy(), *reversed(keys)])
+    return results.flow.to_numpy()[order]
+
+
+def sorted_shortfall(shortfall):
+    """Return a shortfall table with string node ids, ordered by node"""
+    if shortfall is None:
+        return None
+    shortfall = shortfall.assign(node=shortfall.node.astype(str))
+    return shortfall.sort_values(["node", "timestep"]).reset_index(drop=True)
+
+
+def assert_same_shortfall(result, expected):
+    result, expected = sorted_shortfall(result), sorted_shortfall(expected)
+    if expected is None:
+        assert result is None
+        return
+    assert result.node.tolist() == expected.node.tolist()
+    assert result.timestep.tolist() == expected.timestep.tolist()
+    np.testing.assert_allclose(result.shortfall, expected.shortfall, atol=1e-6)
@@ -0,0 +1,79 @@
+"""
+    test_arcs.py
+        Lazy (arc, timestep) index against the time expanded edge table
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from jem.arcs import ArcIndex
+from jem.meta import metainfo
+
+
+@pytest.fixture
+def tables():
+    edges = pd.DataFrame(
+        {
+            "id": ["e1", "e2", "e3", "e4"],
+            "from_id": ["a", "b", "a", "c"],
+            "to_id": ["b", "c", "b", "a"],
+            "length": [1.0, 2.0, 3.0, 4.0],
+            "min": 0,
+            "max": [10.0, 20.0, 30.0, 40.0],
+        }
+    )
+    flows = pd.DataFrame(
+        {"timestep": np.repeat([1, 2, 3], 2), "node": ["a", "b"] * 3, "flow": 1.0}
+    )
+    return edges, flows
+
+
+def expanded(edges, timesteps):
+    """Return the edges copied once per timestep, as they used to be"""
+    header = metainfo["edges_header"]
+    return pd.concat(
+        [edges[header].assign(timestep=t) for t in timesteps], ignore_index=True
+    )
+
+
+def test_columns_broadcast_over_timesteps(tables):
+    edges, flows = tables
+    arcs = ArcIndex(edges, flows)
+    assert len(arcs) == 12
+    pd.testing.assert_frame_equal(arcs.frame(), expanded(edges, [1, 2, 3]))
+    assert arcs.max.tolist() == expanded(edges, [1, 2, 3])["max"].tolist()
+
+    frame = arcs.frame(edges=[1, 3], timesteps=[3, 1])
+    assert frame.id.tolist() == ["e2", "e4", "e2", "e4"]
+    assert frame.timestep.tolist() == [3, 3, 1, 1]
+
+
+def test_set_static_and_per_timestep(tables):
+    edges, flows = tables
+    arcs = ArcIndex(edges, flows)
+    into_b = (edges.to_id == "b").to_numpy()
+
+    arcs.set("max", 5.0, where=into_b)
+    assert arcs.varying == {}
+    reference = expanded(edges, [1, 2, 3])
+    reference.loc[reference.to_id == "b", "max"] = 5.0
+    assert arcs.max.tolist() == reference["max"].tolist()
+
+    arcs.set("max", 0.0, where=into_b, timesteps=[2])
+    assert arcs.varying["max"].shape == (3, 4)
+    reference.loc[(reference.to_id == "b") & (reference.timestep == 2), "max"] = 0.0
+    assert arcs.max.tolist() == reference["max"].tolist()
+
+    # once varying, a set without timesteps changes every timestep
+    arcs.set("max", 7.0, where=~into_b)
+    reference.loc[reference.to_id != "b", "max"] = 7.0
+    assert arcs.max.tolist() == reference["max"].tolist()
+    assert arcs.column("max", timesteps=[2]).tolist() == [0.0, 7.0, 0.0, 7.0]
+    assert edges["max"].tolist() == [10.0, 20.0, 30.0, 40.0]
+
+
+def test_unique_keeps_last_parallel_edge(tables):
+    edges, flows = tables
+    arcs = ArcIndex(edges, flows)
+    assert arcs.unique(["from_id", "to_id", "timestep"]).tolist() == [1, 2, 3]
@@ -0,0 +1,68 @@
+"""
+    test_build.py
+        Matrix builds against the constraint-by-constraint build
+"""
+
+import numpy as np
+import pytest
+
+from jem.model import jem
+
+from .networks import arcflows, objective
+
+# build(method="constraints") needs Gurobi
+pytest.importorskip("gurobipy")
+
+# build options of the matrix build, each checked on its own
+options = {
+    "default": {},
+    "variables": {"flow_bounds": "variables"},
+    "radial": {"radial": True},
+    "decompose": {"decompose": True},
+    "unique_timesteps": {"unique_timesteps": True},
+    "slack": {"slack": True},
+    "junctions": {"junctions": True},
+    "decompose_reduced": {
+        "decompose": True,
+        "unique_timesteps": True,
+        "slack": True,
+        "junctions": True,
+        "radial": True,
+    },
+}
+
+
+def solve(nodes, edges, flows, caps=False, workers=1, **kwargs):
+    network = jem(nodes, edges, flows, super_sink=False)
+    if caps:
+        # caps of the arcs into a sink in the last timestep only
+        static = network.edge_indices.static
+        capped = (static.to_id == "node_9") & (static.from_id != "super_source")
+        network.edge_indices.set("max", 1e-12, where=capped, timesteps=[3])
+    network.build(**kwargs)
+    network.optimise(workers=workers)
+    return network
+
+
+@pytest.mark.parametrize("name", options)
+def test_matrix_build_matches_constraints(network, name):
+    reference = solve(*network, method="constraints")
+    result = solve(*network, method="matrix", **options[name])
+
+    assert objective(result) == pytest.approx(objective(reference), rel=1e-9)
+    np.testing.assert_allclose(arcflows(result), arcflows(reference), atol=1e-6)
+
+
+def test_options_need_matrix_build(network):
+    with pytest.raises(ValueError):
+        jem(*network, super_sink=False).build(method="constraints", radial=True)
+
+
+@pytest.mark.parametrize("name", ["decompose", "decompose_reduced"])
+def test_decomposed_workers_match_constraints(network, name):
+    reference = solve(*network, caps=True, method="constraints")
+    result = solve(*network, caps=True, workers=2, **options[name])
+    assert result.arcs is None
+
+    assert objective(result) == pytest.approx(objective(reference), rel=1e-9)
+    np.testing.assert_allclose(arcflows(result), arcflows(reference), atol=1e-6)
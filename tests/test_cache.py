@@ -0,0 +1,155 @@
+"""
+    test_cache.py
+        Scenario outcomes cached across sweeps
+"""
+
+import json
+
+import pandas as pd
+import pytest
+
+from jem import sweeps
+from jem.cache import ScenarioCache, fingerprint
+from jem.model import jem
+
+from .test_scenarios import single_failures
+
+
+def outcome(objective):
+    return {"status": "optimal", "objective": objective, "shortfall": []}
+
+
+@pytest.fixture
+def built(network):
+    network = jem(*network, super_sink=False, solver="highs")
+    network.build(flow_bounds="variables")
+    return network
+
+
+@pytest.fixture
+def solved(monkeypatch):
+    """Keys of the scenarios solved by sweeps, rather than found in a cache"""
+    keys = []
+    solve_chunk = sweeps.solve_chunk
+
+    def counted(chunk):
+        keys.extend(key for key, _ in chunk)
+        return solve_chunk(chunk)
+
+    monkeypatch.setattr(sweeps, "solve_chunk", counted)
+    return keys
+
+
+def impacts(records):
+    frames = [
+        record["impacts"].assign(key=record["key"])
+        for record in records
+        if record["impacts"] is not None
+    ]
+    table = pd.concat(frames, ignore_index=True)
+    return table.sort_values(["key", "node", "timestep"]).reset_index(drop=True)
+
+
+def test_key_ignores_order_and_repeats(tmp_path):
+    with ScenarioCache(tmp_path, "network") as cache:
+        assert cache.key(["b", "a"]) == cache.key(["a", "b", "a"])
+        assert cache.key(["a"]) != cache.key(edges=["a"])
+        with ScenarioCache(tmp_path / "other", "other network") as other:
+            assert cache.key(["a"]) != other.key(["a"])
+
+
+def test_hits_and_misses(tmp_path):
+    with ScenarioCache(tmp_path, "network") as cache:
+        digest = cache.key(["a"])
+        assert cache.get(digest) is None
+        cache.put([(digest, outcome(1.0))])
+        assert cache.get(digest) == outcome(1.0)
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    # outcomes are kept for the next sweep
+    with ScenarioCache(tmp_path, "network") as cache:
+        assert len(cache) == 1
+        assert cache.get(cache.key(["a"])) == outcome(1.0)
+
+
+def test_evicts_least_recently_used(tmp_path):
+    size = len(json.dumps(outcome(0.0)))
+    with ScenarioCache(tmp_path, "network", max_bytes=3 * size) as cache:
+        digests = [cache.key([name]) for name in "abcd"]
+        for digest in digests[:3]:
+            cache.put([(digest, outcome(0.0))])
+        # using a keeps it, so b is the least recently used
+        cache.get(digests[0])
+        cache.put([(digests[3], outcome(0.0))])
+
+        assert len(cache) == 3
+        assert cache.size <= cache.max_bytes
+        assert cache.get(digests[1]) is None
+        assert all(cache.get(digest) is not None for digest in digests[::2])
+
+
+def test_evicts_outcomes_of_other_processes(tmp_path):
+    size = len(json.dumps(outcome(0.0)))
+    first = ScenarioCache(tmp_path, "network", max_bytes=3 * size)
+    second = ScenarioCache(tmp_path, "network", max_bytes=3 * size)
+    with first, second:
+        for name in "ab":
+            first.put([(first.key([name]), outcome(0.0))])
+        for name in "cd":
+            second.put([(second.key([name]), outcome(0.0))])
+
+        assert len(first) == 3
+        assert first.size == second.size == 3 * size
+        assert first.get(first.key(["a"])) is None
+
+
+def test_fingerprint_changes_with_options(built):
+    assert fingerprint(built, solver="highs") == fingerprint(built, solver="highs")
+    assert fingerprint(built, solver="highs") != fingerprint(built, solver="gurobi")
+    assert fingerprint(built, radial=False) != fingerprint(built, radial=True)
+
+    baseline = fingerprint(built)
+    static = built.edge_indices.static
+    built.edge_indices.set("max", 50, where=static.to_id == "node_9", timesteps=[2])
+    capped = fingerprint(built)
+    assert capped != baseline
+    built.edge_indices.set("max", 40, where=static.to_id == "node_9")
+    assert fingerprint(built) not in [baseline, capped]
+    built.flows = built.flows.assign(flow=built.flows.flow * 2)
+    assert fingerprint(built) not in [baseline, capped]
+
+
+def test_sweep_finds_solved_scenarios(tmp_path, network, built, solved):
+    nodes, edges, _ = network
+    scenarios = single_failures(nodes, edges)[14:34]
+
+    first = list(built.sweep(scenarios, workers=1, cache=tmp_path))
+    assert sorted(solved) == list(range(len(scenarios)))
+
+    solved.clear()
+    again = list(built.sweep(scenarios, workers=1, cache=tmp_path))
+    assert solved == []
+    assert [record["status"] for record in sorted(again, key=lambda r: r["key"])] == [
+        record["status"] for record in first
+    ]
+    pd.testing.assert_frame_equal(impacts(again), impacts(first))
+
+
+def test_arcflows_only_solves_scenarios_short_of_supply(
+    tmp_path, network, built, solved
+):
+    nodes, edges, _ = network
+    scenarios = single_failures(nodes, edges)[14:34]
+    first = list(built.sweep(scenarios, workers=1, cache=tmp_path))
+    short = [
+        record["key"]
+        for record in first
+        if record["impacts"] is not None and not record["impacts"].empty
+    ]
+    assert 0 < len(short) < len(scenarios)
+
+    solved.clear()
+    again = list(built.sweep(scenarios, workers=1, cache=tmp_path, arcflows=True))
+    assert sorted(solved) == short
+    for record in again:
+        assert (record["arcflows"] is not None) == (record["key"] in short)
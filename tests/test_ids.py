@@ -0,0 +1,61 @@
+"""
+    test_ids.py
+        Interned node and edge ids
+"""
+
+import numpy as np
+import pandas as pd
+
+from jem import ids
+from jem.model import jem
+
+
+def test_id_table_round_trips():
+    table = ids.IdTable(["b", "a", "b", None, "c"])
+    assert table.ids.tolist() == ["b", "a", "c"]
+    assert len(table) == 3
+
+    values = ["c", "a", "x", "b"]
+    codes = table.encode(values)
+    assert codes.dtype == np.int32
+    assert codes.tolist() == [2, 1, -1, 0]
+    assert list(table.decode(codes)) == ["c", "a", np.nan, "b"]
+
+    interned = table.intern(["c", "a", "b"])
+    assert ids.interned(interned)
+    assert interned.cat.codes.tolist() == [2, 1, 0]
+    assert table.intern(interned).cat.codes.tolist() == [2, 1, 0]
+    assert not ids.interned(pd.Series(values))
+
+
+def test_positions_and_labels():
+    index = pd.Index(["a", "b", "c"])
+    values = pd.Categorical(["c", "z", None, "a"], categories=["z", "a", "c"])
+    assert ids.positions(index, values).tolist() == [2, -1, -1, 0]
+    assert ids.positions(index, ["b", "z"]).tolist() == [1, -1]
+
+    dtype = pd.CategoricalDtype(index)
+    assert list(ids.labels(index, [2, 0], dtype)) == ["c", "a"]
+    # a dtype over other ids gives the id strings
+    assert ids.labels(index, [2, 0], pd.CategoricalDtype(["a"])).tolist() == ["c", "a"]
+
+
+def test_keys_use_codes():
+    table = ids.IdTable(["a", "b"])
+    frame = pd.DataFrame({"from_id": table.intern(["b", "a"]), "timestep": [1, 2]})
+    assert ids.keys(frame, ["from_id", "timestep"]) == [(1, 1), (0, 2)]
+
+
+def test_model_ids_read_back_as_strings(network):
+    nodes, edges, _ = network
+    model = jem(*network, super_sink=False, solver="highs")
+    assert ids.interned(model.nodes.id) and ids.interned(model.edges.from_id)
+    assert model.nodes.id.astype(str).tolist() == nodes.id.tolist()
+    assert model.edges.id.astype(str).tolist()[: len(edges)] == edges.id.tolist()
+    # every end of an edge, super nodes included, has a code
+    assert (model.node_ids.encode(model.edges.to_id) >= 0).all()
+
+    model.build(flow_bounds="variables")
+    model.optimise()
+    results = model.results_arcflows
+    assert set(results.from_id.astype(str)) <= set(model.node_ids.ids)
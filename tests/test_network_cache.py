@@ -0,0 +1,79 @@
+"""
+    test_network_cache.py
+        Preprocessed networks stored in and loaded from the network cache
+"""
+
+import os
+
+import pandas as pd
+import pytest
+
+from jem import cache
+from jem.model import jem
+
+from .networks import objective
+
+
+@pytest.fixture
+def files(tmp_path, network):
+    """Return paths of the network written as csv files"""
+    paths = []
+    for name, table in zip(["nodes", "edges", "flows"], network):
+        paths.append(str(tmp_path / f"{name}.csv"))
+        table.to_csv(paths[-1], index=False)
+    return paths
+
+
+def entries(cache_dir):
+    return os.listdir(os.path.join(cache_dir, "networks"))
+
+
+def test_network_round_trips_through_cache(tmp_path, files, monkeypatch):
+    cache_dir = str(tmp_path / "cache")
+    stored = jem(*files, super_sink=False, solver="highs", cache=cache_dir)
+    assert len(entries(cache_dir)) == 1
+
+    def preprocess(*args, **kwargs):
+        raise AssertionError("read the network files again")
+
+    # the second model loads the cached tables instead
+    monkeypatch.setattr(jem, "_preprocess", preprocess)
+    loaded = jem(*files, super_sink=False, solver="highs", cache=cache_dir)
+    for name in ["nodes", "edges", "flows"]:
+        pd.testing.assert_frame_equal(getattr(loaded, name), getattr(stored, name))
+    assert loaded.node_ids.ids.equals(stored.node_ids.ids)
+
+    for network in [stored, loaded]:
+        network.build(flow_bounds="variables")
+        network.optimise()
+    assert objective(loaded) == pytest.approx(objective(stored), rel=1e-12)
+
+
+def test_key_changes_with_contents_and_options(files):
+    key = cache.key(files, super_sink=False)
+    assert cache.key(files, super_sink=False) == key
+    assert cache.key(files, super_sink=True) != key
+
+    edges = pd.read_csv(files[1])
+    edges.loc[0, "max"] = 1
+    edges.to_csv(files[1], index=False)
+    assert cache.key(files, super_sink=False) != key
+
+
+def test_changed_files_are_cached_again(tmp_path, files):
+    cache_dir = str(tmp_path / "cache")
+    first = jem(*files, super_sink=False, solver="highs", cache=cache_dir)
+
+    flows = pd.read_csv(files[2])
+    flows.iloc[:, 0] *= 2
+    flows.to_csv(files[2], index=False)
+    changed = jem(*files, super_sink=False, solver="highs", cache=cache_dir)
+    assert len(entries(cache_dir)) == 2
+    assert changed.flows.flow.sum() > first.flows.flow.sum()
+    assert cache.load(cache_dir, "missing") is None
+
+
+def test_networks_from_dataframes_are_not_cached(tmp_path, network):
+    assert not cache.cacheable(*network)
+    jem(*network, super_sink=False, solver="highs", cache=str(tmp_path))
+    assert not os.path.exists(os.path.join(tmp_path, "networks"))
@@ -0,0 +1,76 @@
+"""
+    test_readers.py
+        Model columns and geometry read from GeoPackages and shapefiles
+"""
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import pytest
+import shapely
+
+from jem import readers
+from jem.meta import metainfo
+from jem.model import jem
+
+from .networks import synthetic_network
+
+
+@pytest.fixture
+def files(tmp_path, network):
+    """Return {extension: (nodes path, edges path)} of the network as GIS files"""
+    nodes, edges, _ = network
+    rng = np.random.default_rng(0)
+    points = shapely.points(rng.random((len(nodes), 2)) * 1000)
+    location = dict(zip(nodes.id, points))
+    lines = [
+        shapely.LineString([location[i], location[j]])
+        for i, j in zip(edges.from_id, edges.to_id)
+    ]
+    # a column the model does not read
+    nodes = gpd.GeoDataFrame(nodes.assign(notes="x"), geometry=points, crs=27700)
+    edges = gpd.GeoDataFrame(edges.assign(notes="x"), geometry=lines, crs=27700)
+
+    gpkg = str(tmp_path / "network.gpkg")
+    nodes.to_file(gpkg, layer="nodes")
+    edges.to_file(gpkg, layer="edges")
+    shp = str(tmp_path / "nodes.shp"), str(tmp_path / "edges.shp")
+    nodes.to_file(shp[0])
+    edges.to_file(shp[1])
+    return {".gpkg": (gpkg, gpkg), ".shp": shp}
+
+
+@pytest.mark.parametrize("extension", [".gpkg", ".shp"])
+def test_read_model_columns_and_geometry(files, extension):
+    for kind, path in zip(["nodes", "edges"], files[extension]):
+        expected = gpd.read_file(path, layer=readers.layer(path, kind))
+        columns = [
+            column for column in metainfo[f"{kind}_model_columns"] if column in expected
+        ]
+        table = readers.read_table(path, kind)
+        assert not isinstance(table, gpd.GeoDataFrame)
+        assert sorted(table.columns) == sorted(columns)
+        pd.testing.assert_frame_equal(
+            table[columns], pd.DataFrame(expected[columns]), check_dtype=False
+        )
+
+        geometry = readers.read_geometry(path, kind)
+        assert geometry.crs == expected.crs
+        assert geometry.geom_equals(expected.geometry).all()
+
+
+def test_model_reads_geometry_on_demand(files, network):
+    _, _, flows = network
+    models = {
+        extension: jem(*paths, flows, super_sink=False, solver="highs")
+        for extension, paths in files.items()
+    }
+    for model in models.values():
+        assert not isinstance(model.edges, gpd.GeoDataFrame)
+        edges = model.geometry("edges")
+        # super arcs get no geometry
+        assert edges.geometry.isna().sum() == (edges.from_id == "super_source").sum()
+    pd.testing.assert_series_equal(
+        models[".gpkg"].geometry("nodes").geometry.to_wkt(),
+        models[".shp"].geometry("nodes").geometry.to_wkt(),
+    )
@@ -0,0 +1,40 @@
+"""
+    test_results.py
+        Arc flow results read out of the solution
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from jem import ids
+from jem.model import jem
+
+
+@pytest.fixture
+def built(network):
+    network = jem(*network, super_sink=False, solver="highs")
+    network.build(flow_bounds="variables")
+    return network
+
+
+def test_results_align_with_arcs(built):
+    built.optimise()
+    results = built.results_arcflows
+    assert results.columns.tolist() == built.indices + ["flow"]
+    for column in built.indices:
+        assert results[column].tolist() == built.arcs[column].tolist()
+    assert ids.interned(results.from_id) and ids.interned(results.to_id)
+    np.testing.assert_array_equal(results.flow.to_numpy(), built.solver.values())
+
+
+def test_nonzero_results_are_the_positive_flows(built):
+    built.optimise()
+    every = built.results_arcflows
+    built.optimise(results="nonzero")
+    nonzero = built.results_arcflows
+    pd.testing.assert_frame_equal(nonzero, every[every.flow > 0].reset_index(drop=True))
+    assert len(nonzero) < len(every)
+
+    with pytest.raises(ValueError):
+        built.optimise(results="some")
@@ -0,0 +1,110 @@
+"""
+    test_scenarios.py
+        Failure scenarios solved in place against fresh models
+"""
+
+import numpy as np
+import pytest
+
+from jem.model import jem
+from jem.scenarios import ScenarioRunner
+
+from .networks import arcflows, assert_same_shortfall, objective
+
+failures = [
+    {"nodes": ["node_1"]},
+    {"edges": ["edge_1", "edge_2"]},
+    {"nodes": ["node_3"], "edges": ["edge_7"]},
+]
+
+
+def single_failures(nodes, edges):
+    """Return one scenario per node that is not a sink and one per edge"""
+    failed_nodes = nodes.id[nodes.asset_type != "sink"]
+    return [{"nodes": [node]} for node in failed_nodes] + [
+        {"edges": [edge]} for edge in edges.id
+    ]
+
+
+def assert_same_outcomes(runner, reference, scenarios):
+    outcomes = zip(runner.run(scenarios), reference.run(scenarios))
+    for (_, shortfall), (_, expected) in outcomes:
+        assert_same_shortfall(shortfall, expected)
+
+
+@pytest.fixture
+def built(network):
+    network = jem(*network, super_sink=False, solver="highs")
+    network.build(flow_bounds="variables")
+    return network
+
+
+@pytest.mark.parametrize("failure", failures)
+def test_apply_failures_matches_attacked_model(network, built, failure):
+    reference = jem(
+        *network,
+        super_sink=False,
+        solver="highs",
+        nodes_to_attack=failure.get("nodes", None),
+        edges_to_attack=failure.get("edges", None),
+    )
+    reference.build(flow_bounds="variables")
+    reference.optimise()
+
+    built.optimise()
+    baseline = arcflows(built)
+    built.apply_failures(**failure)
+    built.optimise()
+    assert objective(built) == pytest.approx(objective(reference), rel=1e-9)
+    np.testing.assert_allclose(arcflows(built), arcflows(reference), atol=1e-6)
+
+    built.reset()
+    built.optimise()
+    np.testing.assert_allclose(arcflows(built), baseline, atol=1e-6)
+
+
+def test_screened_scenarios_match_solves(network):
+    nodes, edges, _ = network
+    runner = ScenarioRunner(jem(*network, super_sink=False, solver="highs"))
+    reference = ScenarioRunner(
+        jem(*network, super_sink=False, solver="highs"), screen=False
+    )
+    assert_same_outcomes(runner, reference, single_failures(nodes, edges))
+    assert runner.screened > 0
+
+
+@pytest.mark.parametrize("capped", [False, True])
+def test_connectivity_matches_solves(network, capped):
+    nodes, edges, _ = network
+
+    def runner(**kwargs):
+        model = jem(*network, super_sink=False, solver="highs")
+        if capped:
+            # per timestep caps of the arcs into two sinks, super arcs too,
+            # that only edge_indices knows of
+            sinks = model.edge_indices.static.to_id.isin(["node_9", "node_12"])
+            model.edge_indices.set("max", 1e-13, where=sinks, timesteps=[2])
+        return ScenarioRunner(model, screen=False, **kwargs)
+
+    connected = runner(connectivity=True)
+    assert_same_outcomes(connected, runner(), single_failures(nodes, edges))
+    assert capped or connected.disconnected > 0
+
+
+def test_batched_scenarios_match_single_solves(network):
+    # batches are Gurobi multi-scenario models
+    pytest.importorskip("gurobipy")
+    nodes, edges, _ = network
+    scenarios = single_failures(nodes, edges)[:12]
+    model = jem(*network, super_sink=False)
+    model.build(flow_bounds="variables")
+
+    single = model.solve_scenarios(scenarios, batch_size=1)
+    batched = model.solve_scenarios(scenarios, batch_size=5)
+    for outcome, expected in zip(batched, single):
+        assert outcome["status"] == expected["status"]
+        if expected["status"] == "optimal":
+            assert outcome["objective"] == pytest.approx(
+                expected["objective"], rel=1e-9
+            )
+            assert_same_shortfall(outcome["shortfall"], expected["shortfall"])
@@ -0,0 +1,51 @@
+"""
+    test_solvers.py
+        HiGHS and Gurobi backends of the matrix build
+"""
+
+import numpy as np
+import pytest
+
+from jem import solvers
+from jem.model import jem
+
+from .networks import arcflows, objective
+
+
+def solve(network, solver, **kwargs):
+    network = jem(*network, super_sink=False, solver=solver)
+    network.build(**kwargs)
+    network.optimise()
+    return network
+
+
+@pytest.mark.parametrize("flow_bounds", ["constraints", "variables"])
+def test_highs_matches_gurobi(network, flow_bounds):
+    pytest.importorskip("gurobipy")
+    highs = solve(network, "highs", flow_bounds=flow_bounds)
+    gurobi = solve(network, "gurobi", flow_bounds=flow_bounds)
+    assert highs.solver.optimal and gurobi.solver.optimal
+    assert objective(highs) == pytest.approx(objective(gurobi), rel=1e-9)
+    assert highs.solver.objective == pytest.approx(gurobi.solver.objective, rel=1e-9)
+    np.testing.assert_allclose(arcflows(highs), arcflows(gurobi), atol=1e-6)
+
+
+def test_highs_bounds_change_in_place(network):
+    highs = solve(network, "highs", flow_bounds="variables")
+    baseline = highs.solver.objective
+    highs.apply_failures(nodes=["node_3"])
+    highs.optimise()
+    assert highs.solver.objective > baseline
+    highs.reset()
+    highs.optimise()
+    assert highs.solver.objective == pytest.approx(baseline, rel=1e-12)
+
+
+def test_highs_errors(network):
+    highs = solve(network, "highs")
+    with pytest.raises(ValueError, match="gurobi"):
+        highs.debug()
+    with pytest.raises(ValueError):
+        jem(*network, solver="highs").build(method="constraints")
+    with pytest.raises(ValueError):
+        solvers.get_solver("cplex")
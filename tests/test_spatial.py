@@ -0,0 +1,67 @@
+"""
+    test_spatial.py
+        Spatial network helpers against the networkx and geopandas results
+"""
+
+import geopandas as gpd
+import networkx as nx
+import numpy as np
+import pandas as pd
+import shapely
+
+from jem.spatial import label_components, snap_to_nodes, to_nx
+
+
+def random_graph(n_nodes=200, n_edges=150, seed=0):
+    """Return (nodes, edges) of a random graph with many small components"""
+    rng = np.random.default_rng(seed)
+    nodes = pd.DataFrame({"id": [f"node_{k}" for k in range(n_nodes)]})
+    ends = rng.integers(0, n_nodes + 5, size=(n_edges, 2))
+    # some edges end at ids missing from the nodes
+    ids = np.array([f"node_{k}" for k in range(n_nodes + 5)], dtype=object)
+    edges = pd.DataFrame(
+        {
+            "from_id": ids[ends[:, 0]],
+            "to_id": ids[ends[:, 1]],
+            "length": rng.random(n_edges),
+        }
+    )
+    return nodes, edges
+
+
+def test_label_components_matches_networkx():
+    nodes, edges = random_graph()
+    node_part, edge_part = label_components(nodes, edges)
+
+    # components as get_isolated_graphs() numbered them with networkx
+    parts = sorted(nx.connected_components(to_nx(nodes, edges)), key=len, reverse=True)
+    labels = {node: count for count, part in enumerate(parts, 1) for node in part}
+    assert node_part.tolist() == nodes.id.map(labels).tolist()
+    assert edge_part.tolist() == edges.from_id.map(labels).tolist()
+    assert len(set(node_part)) < len(nodes)
+
+
+def test_snap_to_nodes_matches_nearest_node():
+    rng = np.random.default_rng(0)
+    nodes = gpd.GeoDataFrame(
+        {"ID": [f"node_{k}" for k in range(300)]},
+        geometry=shapely.points(rng.random((300, 2)) * 100),
+    )
+    lines = [shapely.linestrings(rng.random((3, 2)) * 100) for _ in range(100)]
+    edges = gpd.GeoDataFrame(
+        geometry=lines + [shapely.LineString()], index=np.arange(101) * 2
+    )
+    snapped = snap_to_nodes(nodes, edges)
+
+    # the nearest node to each end, as snkit.network.nearest found it
+    ends = [(0, "from_id", "from_snap"), (-1, "to_id", "to_snap")]
+    for end, node, snap in ends:
+        points = shapely.get_point(edges.geometry.to_numpy()[:-1], end)
+        distances = np.stack([nodes.distance(point).to_numpy() for point in points])
+        nearest = nodes.ID.to_numpy()[distances.argmin(axis=1)]
+        assert snapped[node].iloc[:-1].tolist() == nearest.tolist()
+        np.testing.assert_allclose(snapped[snap].iloc[:-1], distances.min(axis=1))
+
+    assert snapped.index.equals(edges.index)
+    assert snapped.iloc[-1][["from_id", "to_id"]].isna().all()
+    assert np.isnan(snapped.iloc[-1][["from_snap", "to_snap"]].astype(float)).all()
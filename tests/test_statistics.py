@@ -0,0 +1,83 @@
+"""
+    test_statistics.py
+        Indexed statistics against lookups over the whole tables
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from jem.model import jem
+
+
+@pytest.fixture
+def solved(network):
+    """Solved network with the arcs into two sinks cut in some timesteps"""
+    network = jem(*network, super_sink=False, solver="highs")
+    static = network.edge_indices.static
+    fed = static.from_id != "super_source"
+    network.edge_indices.set("max", 0, where=fed & (static.to_id == "node_9"))
+    network.edge_indices.set(
+        "max", 0, where=fed & (static.to_id == "node_15"), timesteps=[2]
+    )
+    network.build(flow_bounds="variables")
+    network.optimise()
+    return network
+
+
+def test_shortfall_matches_super_source_flows(solved):
+    stats = solved.statistics
+    flows = solved.results_arcflows
+    supplied = flows[(flows.from_id == "super_source") & (flows.flow > 0)]
+
+    shortfall = stats.nodes_with_shortfall()
+    assert shortfall.node.astype(str).tolist() == supplied.to_id.astype(str).tolist()
+    assert shortfall.shortfall.tolist() == supplied.flow.tolist()
+    assert set(shortfall.node.astype(str)) == {"node_9", "node_15"}
+    assert stats.total_demand_shortfall() == pytest.approx(supplied.flow.sum())
+
+    nodes = solved.nodes
+    population = nodes[nodes.id.isin(shortfall.node)].population.sum()
+    assert stats.customers_affected() == population
+
+
+def test_lookups_match_table_scans(solved):
+    stats = solved.statistics
+    nodes, flows = solved.nodes, solved.flows
+    asked = ["node_15", "node_9", "missing", "node_9"]
+
+    population = stats.get_population_at_nodes(asked, col_id="node")
+    expected = nodes[nodes.id.isin(asked)]
+    assert population.node.astype(str).tolist() == expected.id.astype(str).tolist()
+    assert population.population.tolist() == expected.population.tolist()
+
+    demand = stats.get_demand_at_nodes(asked)
+    expected = flows[flows.node.isin(asked)]
+    assert demand.node.astype(str).tolist() == expected.node.astype(str).tolist()
+    assert demand.demand.tolist() == expected.flow.tolist()
+
+    nodal = stats.get_flows_at_nodes(["node_15"])
+    arcs = solved.results_arcflows
+    for row in nodal.itertuples():
+        inflow = arcs[(arcs.to_id == "node_15") & (arcs.timestep == row.timestep)]
+        assert row.inflow == pytest.approx(inflow.flow.sum())
+
+    balance = stats.supply_demand_balance()
+    sources = nodes.id[nodes.asset_type == "source"]
+    supply = flows[flows.node.isin(sources)].flow.sum()
+    assert balance.supply.iloc[0] == pytest.approx(supply)
+
+
+def test_cached_results_are_copied(solved):
+    stats = solved.statistics
+    shortfall = stats.nodes_with_shortfall()
+    shortfall["shortfall"] = np.nan
+    assert stats.nodes_with_shortfall().shortfall.notna().all()
+    assert stats.super_source_flows() is not stats.super_source_flows()
+    # a new solution gets new statistics
+    solved.reset()
+    solved.optimise()
+    assert solved.statistics is not stats
+    pd.testing.assert_frame_equal(
+        solved.statistics.nodes_with_shortfall(), stats.nodes_with_shortfall()
+    )
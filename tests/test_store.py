@@ -0,0 +1,94 @@
+"""
+    test_store.py
+        Sweeps stored to a ResultStore and resumed
+"""
+
+import itertools
+import sqlite3
+from contextlib import closing
+
+import numpy as np
+import pandas as pd
+
+from jem.model import jem
+from jem.store import ResultStore
+
+from .test_scenarios import single_failures
+
+
+def impacts(shortfall):
+    return pd.DataFrame(
+        {
+            "node": shortfall,
+            "asset_type": "sink",
+            "population": 10.0,
+            "demand": 1.0,
+            "shortfall": 0.5,
+            "timestep": 1,
+        }
+    )
+
+
+def stored(store):
+    return (
+        store.read()
+        .sort_values(["key", "node", "timestep"], na_position="first")
+        .reset_index(drop=True)
+    )
+
+
+def test_append_skips_stored_keys(tmp_path):
+    with ResultStore(tmp_path / "results.sqlite") as store:
+        records = [
+            {"key": 0, "status": "optimal", "impacts": impacts(["a", "b"])},
+            {"key": "edge", "status": "optimal", "impacts": None},
+            {"key": np.int64(2), "status": "infeasible", "impacts": None},
+        ]
+        for record, objective in zip(records, [1.5, 2.5, None]):
+            record["objective"] = objective
+        assert store.append(records) == 3
+        assert store.append(records[:2]) == 0
+        assert store.append([{**records[0], "key": np.int64(0)}]) == 0
+        assert len(store) == 3
+        assert store.completed() == {0, "edge", 2}
+
+        table = store.read()
+        assert table.key.tolist() == [0, 0, "edge", 2]
+        assert table.node.tolist()[:2] == ["a", "b"]
+        assert table.node[2:].isna().all()
+        assert table.objective.tolist()[:3] == [1.5, 1.5, 2.5]
+        assert np.isnan(table.objective.iloc[3])
+
+
+def test_opens_stores_without_objectives(tmp_path):
+    path = tmp_path / "results.sqlite"
+    with closing(sqlite3.connect(path)) as connection, connection:
+        connection.execute("CREATE TABLE scenarios (key PRIMARY KEY, status TEXT)")
+        connection.execute("INSERT INTO scenarios VALUES (0, 'optimal')")
+    with ResultStore(path) as store:
+        store.append([{"key": 1, "status": "optimal", "objective": 3.0}])
+        assert store.read().objective.tolist()[1] == 3.0
+
+
+def test_sweep_resumes_from_store(tmp_path, network):
+    nodes, edges, _ = network
+    scenarios = single_failures(nodes, edges)[:10]
+    model = jem(*network, super_sink=False, solver="highs")
+    model.build(flow_bounds="variables")
+
+    with ResultStore(tmp_path / "full.sqlite") as full:
+        for _ in model.sweep(scenarios, workers=1, chunksize=2, store=full):
+            pass
+        expected = stored(full)
+
+    with ResultStore(tmp_path / "resumed.sqlite") as store:
+        # stop part way through the third chunk
+        stopped = model.sweep(scenarios, workers=1, chunksize=2, store=store)
+        first = [record["key"] for record in itertools.islice(stopped, 5)]
+        stopped.close()
+        assert store.completed() == set(range(6))
+
+        rest = model.sweep(scenarios, workers=1, chunksize=2, store=store)
+        assert sorted(record["key"] for record in rest) == list(range(6, 10))
+        assert set(first) < store.completed()
+        pd.testing.assert_frame_equal(stored(store), expected)
@@ -0,0 +1,94 @@
+"""
+    test_sweeps.py
+        Sweeps solved by a pool of workers against serial sweeps
+"""
+
+import itertools
+
+import pandas as pd
+import pytest
+
+from jem.model import jem
+from jem.store import ResultStore
+
+from .test_scenarios import single_failures
+from .test_store import stored
+
+
+def by_key(records):
+    return sorted(records, key=lambda record: record["key"])
+
+
+def assert_same_records(records, expected):
+    records, expected = by_key(records), by_key(expected)
+    assert [record["key"] for record in records] == [
+        record["key"] for record in expected
+    ]
+    for record, other in zip(records, expected):
+        assert record["status"] == other["status"]
+        if other["objective"] is None:
+            assert record["objective"] is None
+        else:
+            assert record["objective"] == pytest.approx(other["objective"], rel=1e-9)
+        if other["impacts"] is None:
+            assert record["impacts"] is None
+            continue
+        pd.testing.assert_frame_equal(
+            record["impacts"].reset_index(drop=True),
+            other["impacts"].reset_index(drop=True),
+        )
+
+
+@pytest.fixture
+def scenarios(network):
+    nodes, edges, _ = network
+    return single_failures(nodes, edges)[::4]
+
+
+@pytest.fixture
+def capped(network):
+    """Network with the arcs into sinks capped through its arc index"""
+    network = jem(*network, super_sink=False, solver="highs")
+    static = network.edge_indices.static
+    fed = static.from_id != "super_source"
+    network.edge_indices.set("max", 0, where=fed & static.to_id.isin(["node_9"]))
+    network.edge_indices.set(
+        "max", 0, where=fed & static.to_id.isin(["node_15"]), timesteps=[2]
+    )
+    network.build(flow_bounds="variables")
+    return network
+
+
+def test_workers_match_serial_sweep(capped, scenarios):
+    serial = list(capped.sweep(scenarios, workers=1))
+    pooled = list(capped.sweep(scenarios, workers=2, chunksize=3))
+    assert_same_records(pooled, serial)
+
+    # the caps reach the workers
+    short = set().union(*(record["impacts"].node for record in pooled))
+    assert {"node_9", "node_15"} <= short
+
+
+def test_workers_store_and_resume(tmp_path, network, scenarios):
+    model = jem(*network, super_sink=False, solver="highs")
+    model.build(flow_bounds="variables")
+    serial = list(model.sweep(scenarios, workers=1))
+
+    with ResultStore(tmp_path / "serial.sqlite") as store:
+        list(model.sweep(scenarios, workers=1, store=store))
+        expected = stored(store)
+
+    with ResultStore(tmp_path / "pooled.sqlite") as store:
+        stopped = model.sweep(scenarios, workers=2, chunksize=2, store=store)
+        first = list(itertools.islice(stopped, 3))
+        stopped.close()
+        done = store.completed()
+        assert {record["key"] for record in first} <= done
+        assert len(done) < len(scenarios)
+
+        rest = list(model.sweep(scenarios, workers=2, chunksize=2, store=store))
+        assert {record["key"] for record in rest} == set(range(len(scenarios))) - done
+        assert_same_records(
+            rest, [record for record in serial if record["key"] not in done]
+        )
+        pd.testing.assert_frame_equal(stored(store), expected)
@@ -0,0 +1,70 @@
+"""
+    test_utils.py
+        Nodal queries, balances and failed arcs against table scans
+"""
+
+import numpy as np
+import pytest
+
+from jem import utils
+from jem.model import jem
+
+
+@pytest.fixture
+def solved(network):
+    network = jem(*network, super_sink=False, solver="highs")
+    network.build(flow_bounds="variables")
+    network.optimise()
+    return network
+
+
+def test_mass_balance():
+    inflow = np.array([1.0, 2.0, 3.0])
+    outflow = np.array([1.0, 3.0, 2.0])
+    assert utils.mass_balance(inflow, outflow).tolist() == [
+        "balanced",
+        "excess",
+        "shortage",
+    ]
+    assert str(utils.mass_balance(1.0, 1.0)) == "balanced"
+
+
+def test_nodal_queries_match_table_scans(solved):
+    edges, arcs = solved.edges, solved.results_arcflows
+    for node in ["node_1", "node_9", "super_source"]:
+        nodal = utils.get_nodal_edges(solved, node)
+        expected = edges[(edges.from_id == node) | (edges.to_id == node)]
+        assert nodal.index.tolist() == expected.index.tolist()
+
+        inflow = utils.get_nodal_inflow(solved, node)
+        assert inflow.index.tolist() == arcs.index[arcs.to_id == node].tolist()
+        outflow = utils.get_nodal_outflow(solved, node)
+        assert outflow.index.tolist() == arcs.index[arcs.from_id == node].tolist()
+
+        balance = utils.get_nodal_balance(solved, node)
+        assert balance["inflow"] == pytest.approx(inflow.flow.sum())
+        assert balance["outflow"] == pytest.approx(outflow.flow.sum())
+    assert utils.get_nodal_edges(solved, "missing").empty
+
+
+def test_nodal_balances_match_groupby(solved):
+    arcs = solved.results_arcflows
+    balances = utils.get_nodal_balances(solved).set_index(["node", "timestep"])
+    inflow = arcs.groupby(["to_id", "timestep"], observed=True).flow.sum()
+    outflow = arcs.groupby(["from_id", "timestep"], observed=True).flow.sum()
+    for (node, t), flow in inflow.items():
+        assert balances.inflow[node, t] == pytest.approx(flow)
+    for (node, t), flow in outflow.items():
+        assert balances.outflow[node, t] == pytest.approx(flow)
+    assert len(balances) == len(solved.node_ids) * len(solved.timesteps)
+
+
+def test_failed_arcs(solved):
+    arcs = solved.arcs
+    failed = utils.get_failed_arcs(arcs, ["node_9"], ["edge_1"])
+    expected = (
+        (arcs.from_id == "node_9") | (arcs.to_id == "node_9") | (arcs.id == "edge_1")
+    )
+    assert failed.tolist() == expected.tolist()
+    assert failed.any()
+    assert not utils.get_failed_arcs(arcs).any()